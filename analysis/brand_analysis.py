@@ -1,11 +1,20 @@
+import sys
 import pandas as pd
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils import ingest, parquet_store
+from utils.membership import membership
+from utils.paths import data_dir, dataset_dir
+
 # --------------------------
 # Paths
 # --------------------------
-DATA_PATH = Path("../data/raw/tiktok_discovery_final.csv")
-OUTPUT_PATH = Path("brand_video_counts.csv")  # saved in analysis/
+DATASET_PATH = dataset_dir()  # Parquet built from the cleaned CSV (kbeauty clean --parquet)
+DATA_PATH = data_dir() / "raw" / "tiktok_discovery_final.csv"  # used until the dataset is built
+HASHTAG_SEEDS = None  # e.g. ["kbeauty"]: only read these seed partitions
+OUTPUT_PATH = Path(__file__).resolve().parent / "brand_video_counts.csv"  # saved in analysis/
+MEMBERSHIP_DIR = data_dir() / "interim" / "membership"  # cached video x brand matrices
 
 # --------------------------
 # Brand Aliases
@@ -100,7 +109,12 @@ BRAND_ALIASES = {
 # --------------------------
 # Load dataset
 # --------------------------
-df = pd.read_csv(DATA_PATH)
+df = ingest.load(
+    DATASET_PATH,
+    columns=["Caption", "Hashtags"],
+    filters=parquet_store.make_filters(seeds=HASHTAG_SEEDS),
+    csv_path=DATA_PATH,
+)
 
 df["Caption_norm"] = df["Caption"].fillna("").str.lower()
 df["Hashtags_norm"] = df["Hashtags"].fillna("").str.lower()
@@ -108,14 +122,9 @@ df["Hashtags_norm"] = df["Hashtags"].fillna("").str.lower()
 # --------------------------
 # Count unique videos per brand
 # --------------------------
-brand_counts = {}
-for brand, aliases in BRAND_ALIASES.items():
-    mask = df.apply(
-        lambda row: any(alias.lower() in row["Caption_norm"] or alias.lower() in row["Hashtags_norm"]
-                        for alias in aliases),
-        axis=1
-    )
-    brand_counts[brand] = mask.sum()
+# videos x brands membership (every brand a video mentions); only new captions are scanned
+brands = membership(df, ["Caption_norm", "Hashtags_norm"], BRAND_ALIASES, MEMBERSHIP_DIR, "brands")
+brand_counts = dict(zip(BRAND_ALIASES, brands.sum(axis=0).A1))
 
 # Filter out low counts (<5) and sort
 result = pd.DataFrame(list(brand_counts.items()), columns=["Brand", "Video_Count"])
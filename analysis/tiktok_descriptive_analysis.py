@@ -1,15 +1,30 @@
+import numpy as np
 import pandas as pd
 import re
+import sys
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils import ingest, parquet_store
+from utils.aliases import AliasMatcher
+from utils.aggregates import AggregateStore
+from utils.membership import membership, first_match, one_hot, alias_key
+from utils.paths import data_dir, dataset_dir
+
 # --------------------------
 # File Paths
 # --------------------------
-DATA_PATH = Path("../data/raw/tiktok_discovery_final.csv")
-CLEANED_PATH = Path("../data/interim/tiktok_cleaned.csv")
-BRAND_STATS_PATH = Path("brand_stats.csv")
-PRODUCT_STATS_PATH = Path("product_stats.csv")
-HASHTAG_STATS_PATH = Path("hashtag_stats.csv")
+DATASET_PATH = dataset_dir()  # Parquet built from the cleaned CSV (kbeauty clean --parquet)
+DATA_PATH = data_dir() / "raw" / "tiktok_discovery_final.csv"  # used until the dataset is built
+HASHTAG_SEEDS = None      # e.g. ["kbeauty"]: only read these seed partitions
+MIN_UPLOAD_MONTH = None   # e.g. "2025-01": skip older upload-month partitions
+CLEANED_PATH = data_dir() / "interim" / "tiktok_cleaned.csv"
+BRAND_STATS_PATH = Path(__file__).resolve().parent / "brand_stats.csv"
+PRODUCT_STATS_PATH = Path(__file__).resolve().parent / "product_stats.csv"
+HASHTAG_STATS_PATH = Path(__file__).resolve().parent / "hashtag_stats.csv"
+MEMBERSHIP_DIR = data_dir() / "interim" / "membership"  # cached video x brand / product matrices
+AGGREGATES_PATH = data_dir() / "interim" / "descriptive_aggregates.json"  # running stats + Video_ID watermark
+REBUILD_AGGREGATES = False  # True: recompute from all rows (e.g. after captions were fixed in place)
 
 # --------------------------
 # Brand Aliases (broad)
@@ -159,31 +174,38 @@ PRODUCT_ALIASES = {
 }
 
 
+# Flattened (brand, product) labels for the membership matrix; each brand's products
+# occupy one column span, in dictionary order (first listed wins)
+PRODUCT_LABELS = {}
+PRODUCT_SPANS = {}
+for _brand, _products in PRODUCT_ALIASES.items():
+    PRODUCT_SPANS[_brand] = (len(PRODUCT_LABELS), len(PRODUCT_LABELS) + len(_products))
+    for _product, _aliases in _products.items():
+        PRODUCT_LABELS[(_brand, _product)] = _aliases
+
+# Brand-level stats: output column -> dataset column, averaged per brand
+BRAND_METRICS = {
+    "Avg_Likes": "Like_Count",
+    "Avg_Comments": "Comment_Count",
+    "Avg_Shares": "Share_Count",
+    "Avg_Engagement": "Engagement",
+    "Share_Like_Ratio": "Share_Like_Ratio",
+    "Comment_Like_Ratio": "Comment_Like_Ratio",
+}
+
+
 # --------------------------
 # Helpers
 # --------------------------
 def normalize_text(text):
     return re.sub(r'[^a-z0-9]', '', str(text).lower())
 
-def find_brand(row):
-    for brand, aliases in BRAND_ALIASES.items():
-        for alias in aliases:
-            if alias in row["Caption_norm"] or alias in row["Hashtags_norm"]:
-                return brand
-    return None
-
-def find_product(row, brand):
+def find_product(caption, hashtags, brand, product):
+    """`product`: the brand's first matching specific product (from the membership matrix), or None."""
     if not brand:
         return None
-
-    caption = row["Caption_clean"]
-    hashtags = row["Hashtags_clean"]
-
-    # Check specific product aliases
-    for product_name, aliases in PRODUCT_ALIASES.get(brand, {}).items():
-        for alias in aliases:
-            if alias in caption or alias in hashtags:
-                return product_name
+    if product:
+        return product
 
     # Fallback to generic product bucket
     if "toner" in caption or "toner" in hashtags:
@@ -216,17 +238,8 @@ def inspect_other_hashtags(df, brand_aliases, top_n=30):
     counts.columns = ["Hashtag", "Count"]
 
     # Try to suggest brands
-    suggestions = []
-    for hashtag in counts["Hashtag"]:
-        matched_brand = None
-        for brand, aliases in brand_aliases.items():
-            for alias in aliases:
-                if alias in hashtag:
-                    matched_brand = brand
-                    break
-            if matched_brand:
-                break
-        suggestions.append(matched_brand if matched_brand else "Unknown")
+    matcher = AliasMatcher(brand_aliases)
+    suggestions = [matcher.first(hashtag) or "Unknown" for hashtag in counts["Hashtag"]]
 
     counts["Suggested_Brand"] = suggestions
     return counts.head(top_n)
@@ -235,7 +248,32 @@ def inspect_other_hashtags(df, brand_aliases, top_n=30):
 # --------------------------
 # Load + Prep
 # --------------------------
-df = pd.read_csv(DATA_PATH)
+df = ingest.load(
+    DATASET_PATH,
+    columns=["Video_ID", "Caption", "Hashtags", "Like_Count", "Comment_Count", "Share_Count"],
+    filters=parquet_store.make_filters(seeds=HASHTAG_SEEDS, min_month=MIN_UPLOAD_MONTH),
+    csv_path=DATA_PATH,
+)
+
+# Only rows above the Video_ID watermark are new; the stored aggregates cover the rest.
+# Changing the aliases or the partition filters invalidates them.
+store = AggregateStore(
+    AGGREGATES_PATH,
+    key=f"{alias_key(BRAND_ALIASES)}-{alias_key(PRODUCT_LABELS)}-{HASHTAG_SEEDS}-{MIN_UPLOAD_MONTH}",
+    rebuild=REBUILD_AGGREGATES,
+)
+# The cleaned CSV only counts up to the size recorded with the last save: bytes past it were
+# appended by a run that crashed before saving; a shorter / missing file (or no recorded size)
+# means a rebuild.
+cleaned_size = CLEANED_PATH.stat().st_size if CLEANED_PATH.exists() else 0
+if store.watermark and cleaned_size < store.meta.get("cleaned_size", float("inf")):
+    print(f"[Aggregates] {CLEANED_PATH} is out of step with the aggregates, rebuilding from all rows")
+    store = AggregateStore(AGGREGATES_PATH, key=store.key, rebuild=True)
+elif store.watermark and cleaned_size > store.meta["cleaned_size"]:
+    with open(CLEANED_PATH, "r+b") as f:
+        f.truncate(store.meta["cleaned_size"])
+first_run = store.watermark == 0
+df = df[store.new_rows(df["Video_ID"])].reset_index(drop=True)
 
 df["Caption_norm"] = df["Caption"].fillna("").str.lower()
 df["Hashtags_norm"] = df["Hashtags"].fillna("").str.lower()
@@ -246,52 +284,79 @@ df["Engagement"] = df["Like_Count"] + df["Comment_Count"].fillna(0) + df["Share_
 df["Share_Like_Ratio"] = df["Share_Count"] / df["Like_Count"].replace(0, pd.NA)
 df["Comment_Like_Ratio"] = df["Comment_Count"] / df["Like_Count"].replace(0, pd.NA)
 
-df["Brand"] = df.apply(find_brand, axis=1)
-df["Product"] = df.apply(lambda row: find_product(row, row["Brand"]), axis=1)
+# videos x brands / videos x products membership; only captions not seen before are scanned
+brand_matrix = membership(df, ["Caption_norm", "Hashtags_norm"], BRAND_ALIASES, MEMBERSHIP_DIR, "brands_broad")
+product_matrix = membership(df, ["Caption_clean", "Hashtags_clean"], PRODUCT_LABELS, MEMBERSHIP_DIR, "products")
+
+brand_idx = first_match(brand_matrix)
+df["Brand"] = np.where(brand_idx >= 0, np.array(list(BRAND_ALIASES), dtype=object)[brand_idx], None)
+
+brand_col = df["Brand"].to_numpy()
+matched = np.full(len(df), None, dtype=object)
+for brand, (lo, hi) in PRODUCT_SPANS.items():
+    rows = np.flatnonzero(brand_col == brand)
+    first = first_match(product_matrix[rows][:, lo:hi])
+    names = np.array(list(PRODUCT_ALIASES[brand]), dtype=object)
+    matched[rows[first >= 0]] = names[first[first >= 0]]
+df["Product"] = [find_product(c, h, b, p)
+                 for c, h, b, p in zip(df["Caption_clean"], df["Hashtags_clean"], brand_col, matched)]
 
-df.to_csv(CLEANED_PATH, index=False)
+CLEANED_PATH.parent.mkdir(parents=True, exist_ok=True)
+df.to_csv(CLEANED_PATH, mode="w" if first_run else "a", header=first_run, index=False)
+store.meta["cleaned_size"] = CLEANED_PATH.stat().st_size  # saved with the aggregates below
 
 # --------------------------
 # Brand-level stats
 # --------------------------
-brand_stats = df.groupby("Brand").agg(
-    Videos=("Video_ID", "count"),
-    Avg_Likes=("Like_Count", "mean"),
-    Avg_Comments=("Comment_Count", "mean"),
-    Avg_Shares=("Share_Count", "mean"),
-    Avg_Engagement=("Engagement", "mean"),
-    Share_Like_Ratio=("Share_Like_Ratio", "mean"),
-    Comment_Like_Ratio=("Comment_Like_Ratio", "mean"),
-).reset_index()
+# brands x new videos indicator times the metric columns: per-brand row counts, non-null counts,
+# sums and sums of squares, folded into the running totals
+brands = store.get("brands", ["Brand"], metrics=list(BRAND_METRICS.values()))
+by_brand = one_hot(brand_idx, len(BRAND_ALIASES)).T.tocsr()
+values = df[list(BRAND_METRICS.values())].to_numpy(dtype="float64", na_value=np.nan)
+present = ~np.isnan(values)
+filled = np.where(present, values, 0.0)
+brands.fold([(b,) for b in BRAND_ALIASES], by_brand.getnnz(axis=1),
+            by_brand @ present.astype("float64"), by_brand @ filled, by_brand @ filled ** 2)
+
+totals = brands.frame().sort_values("Brand")
+brand_stats = pd.DataFrame({"Brand": totals["Brand"], "Videos": totals["rows"]})
+for name, col in BRAND_METRICS.items():
+    brand_stats[name] = totals[f"{col}_mean"]
 brand_stats.to_csv(BRAND_STATS_PATH, index=False)
 
 # --------------------------
 # Product-level stats
 # --------------------------
-product_stats = df.groupby(["Brand", "Product"]).agg(
-    Mentions=("Video_ID", "count"),
-    Total_Engagement=("Engagement", "sum"),
-    Median_Engagement=("Engagement", "median"),
-    Engagement_per_Video=("Engagement", "mean")
-).reset_index()
+products = store.get("products", ["Brand", "Product"], metrics=["Engagement"], sketch=["Engagement"])
+products.update(df[["Brand", "Product", "Engagement"]])
 
+totals = products.frame()
+product_stats = pd.DataFrame({
+    "Brand": totals["Brand"],
+    "Product": totals["Product"],
+    "Mentions": totals["rows"],
+    "Total_Engagement": totals["Engagement_sum"].round().astype("int64"),
+    "Median_Engagement": totals["Engagement_median"],  # from the sketch: within 0.5%
+    "Engagement_per_Video": totals["Engagement_mean"],
+})
 product_stats = product_stats.sort_values("Total_Engagement", ascending=False).reset_index(drop=True)
 product_stats.to_csv(PRODUCT_STATS_PATH, index=False)
 
 # --------------------------
 # Hashtag-level stats
 # --------------------------
-hashtag_records = []
-for row in df["Hashtags_norm"].dropna():
-    for tag in str(row).split(","):
-        tag = tag.strip()
-        if tag:
-            hashtag_records.append(tag)
-
-hashtag_counts = pd.Series(hashtag_records).value_counts().reset_index()
-hashtag_counts.columns = ["Hashtag", "Count"]
+tags = df["Hashtags_norm"].str.split(",").explode().str.strip()
+hashtags = store.get("hashtags", ["Hashtag"])
+hashtags.update(pd.DataFrame({"Hashtag": tags[tags.fillna("") != ""].to_numpy()}))
+
+hashtag_counts = hashtags.frame().rename(columns={"rows": "Count"})[["Hashtag", "Count"]]
+hashtag_counts = hashtag_counts.sort_values(["Count", "Hashtag"], ascending=[False, True]).reset_index(drop=True)
 hashtag_counts.to_csv(HASHTAG_STATS_PATH, index=False)
 
+store.advance(df["Video_ID"])
+store.save()
+print(f"[Aggregates] folded in {len(df)} new rows (Video_ID watermark {store.watermark})")
+
 print("Analysis complete. Files saved:")
 print(f"- Cleaned dataset: {CLEANED_PATH}")
 print(f"- Brand stats: {BRAND_STATS_PATH}")
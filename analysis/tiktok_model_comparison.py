@@ -1,4 +1,5 @@
-import os
+import sys
+from pathlib import Path
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import StratifiedKFold, cross_validate, train_test_split
@@ -14,10 +15,27 @@ from textblob import TextBlob
 from imblearn.pipeline import Pipeline as ImbPipeline
 from imblearn.over_sampling import SMOTE
 
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils import ingest, parquet_store
+from utils.paths import data_dir, results_dir, dataset_dir
+
+DATASET_PATH = dataset_dir()  # Parquet with Author_Followers joined in (kbeauty scrape --mode followers)
+DATA_PATH = data_dir() / "raw" / "tiktok_with_followers_with_counts.csv"  # used until the dataset is built
+HASHTAG_SEEDS = None  # e.g. ["kbeauty"]: only read these seed partitions
+RESULTS_DIR = results_dir()
+
 # -----------------------------
 # 1. Load data
 # -----------------------------
-df = pd.read_csv("../data/raw/tiktok_with_followers_with_counts.csv")
+df = ingest.load(
+    DATASET_PATH,
+    columns=["Caption", "Hashtags", "Upload_Date", "Like_Count", "Comment_Count",
+             "Share_Count", "Author_Followers"],
+    filters=parquet_store.make_filters(seeds=HASHTAG_SEEDS),
+    csv_path=DATA_PATH,
+)
+# counts arrive as nullable ints; sklearn wants plain floats with NaN for missing
+df[ingest.COUNT_COLUMNS] = df[ingest.COUNT_COLUMNS].astype("float64")
 
 # -----------------------------
 # 2. Feature engineering (pre-upload only)
@@ -26,7 +44,6 @@ df["Hashtag_Count"] = df["Hashtags"].fillna("").apply(lambda x: len(str(x).split
 df["Text_All"] = df["Caption"].fillna("") + " " + df["Hashtags"].fillna("").str.replace(",", " ")
 df["Sentiment"] = df["Caption"].fillna("").apply(lambda x: TextBlob(str(x)).sentiment.polarity)
 
-df["Upload_Date"] = pd.to_datetime(df["Upload_Date"], errors="coerce", dayfirst=True)
 df["DayOfWeek"] = df["Upload_Date"].dt.dayofweek
 df["Hour"] = df["Upload_Date"].dt.hour
 df["Weekend"] = df["DayOfWeek"].apply(lambda x: 1 if x >= 5 else 0)
@@ -129,8 +146,8 @@ for vt in viral_thresholds:
 # Save CV results
 results_df = pd.DataFrame(all_results)
 print("\nCross-Validation Summary:\n", results_df)
-os.makedirs("../results", exist_ok=True)
-results_df.to_csv("../results/model_comparison_preupload.csv", index=False)
+RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+results_df.to_csv(RESULTS_DIR / "model_comparison_preupload.csv", index=False)
 
 # -----------------------------
 # 6. Grouped Feature Importance (XGBoost, Top 10%)
@@ -199,8 +216,8 @@ grouped_imp = (
 grouped_imp["importance_pct"] = 100 * grouped_imp["importance"] / grouped_imp["importance"].sum()
 
 # Save both detailed + grouped outputs
-os.makedirs("../results", exist_ok=True)
-feat_imp.to_csv("../results/feature_importances_detailed.csv", index=False)
-grouped_imp.to_csv("../results/feature_importances_grouped_avg.csv", index=False)
+RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+feat_imp.to_csv(RESULTS_DIR / "feature_importances_detailed.csv", index=False)
+grouped_imp.to_csv(RESULTS_DIR / "feature_importances_grouped_avg.csv", index=False)
 
 print("\nGrouped Feature Importance (average per feature, % of total):\n", grouped_imp)
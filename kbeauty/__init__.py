@@ -0,0 +1 @@
+# kbeauty/__init__.py
@@ -0,0 +1,4 @@
+# kbeauty/__main__.py
+from kbeauty.cli import main
+
+main()
@@ -0,0 +1,109 @@
+# kbeauty/cli.py
+# One entry point for every stage: python -m kbeauty <command> [...]
+# Only argparse and the standard library load at startup; each command
+# imports what it needs (pandas, Playwright, sklearn, ...) when it runs.
+import argparse
+import os
+import runpy
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# scrape --mode -> script in scraping/
+SCRAPERS = {
+    "main": "tiktok_discovery_main.py",
+    "discovery": "tiktok_discovery.py",
+    "captions": "tiktok_enrich_fix_captions.py",
+    "refresh": "tiktok_refresh.py",
+    "followers": "tiktok_enrich_followers.py",
+    "record": "record_replay.py",
+    "bench": "bench_scrapers.py",
+}
+
+# analysis command -> script in analysis/
+ANALYSES = {
+    "brands": "brand_analysis.py",
+    "describe": "tiktok_descriptive_analysis.py",
+    "models": "tiktok_model_comparison.py",
+}
+
+
+def run_script(path):
+    """Run a stage script as if it were started with `python <path>`."""
+    path = Path(path)
+    sys.path.insert(0, str(path.parent))  # scripts import their siblings
+    sys.argv = [str(path)]
+    runpy.run_path(str(path), run_name="__main__")
+
+
+def cmd_scrape(args):
+    run_script(PROJECT_ROOT / "scraping" / SCRAPERS[args.mode])
+
+
+def cmd_repair(args):
+    from utils.csvrepair import repair_csv
+    from utils.paths import data_dir
+    src = Path(args.src) if args.src else data_dir() / "raw" / "tiktok_discovery.csv"
+    repair_csv(src, args.dst, chunk_rows=args.chunk_rows)
+
+
+def cmd_clean(args):
+    # repair into a separate *_clean.csv and, optionally, build the Parquet dataset from it
+    from utils.csvrepair import repair_csv
+    from utils.paths import data_dir
+    src = Path(args.src) if args.src else data_dir() / "raw" / "tiktok_discovery.csv"
+    dst = Path(args.dst) if args.dst else src.with_name(src.stem + "_clean.csv")
+    repair_csv(src, dst)
+    if args.parquet is not None:
+        from utils import parquet_store
+        from utils.paths import dataset_dir
+        parquet_store.convert_csv(dst, args.parquet or dataset_dir())
+
+
+def cmd_analysis(args):
+    run_script(PROJECT_ROOT / "analysis" / ANALYSES[args.command])
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="kbeauty", description="K-Beauty TikTok pipeline")
+    parser.add_argument("--data-dir", help="data directory (default: data/ in the repo)")
+    parser.add_argument("--results-dir", help="model results directory (default: results/ in the repo)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("scrape", help="run a scraper")
+    p.add_argument("--mode", choices=sorted(SCRAPERS), default="main")
+    p.set_defaults(func=cmd_scrape)
+
+    p = sub.add_parser("repair", help="repair a raw CSV in place (streaming, atomic)")
+    p.add_argument("src", nargs="?", help="CSV to repair (default: raw/tiktok_discovery.csv)")
+    p.add_argument("dst", nargs="?", help="write here instead of replacing src")
+    p.add_argument("--chunk-rows", type=int, default=50_000)
+    p.set_defaults(func=cmd_repair)
+
+    p = sub.add_parser("clean", help="write a repaired *_clean.csv copy")
+    p.add_argument("src", nargs="?", help="CSV to clean (default: raw/tiktok_discovery.csv)")
+    p.add_argument("dst", nargs="?", help="output CSV (default: <src>_clean.csv)")
+    p.add_argument("--parquet", metavar="DIR", nargs="?", const="",
+                   help="also rebuild the analysis' Parquet dataset from the result "
+                        "(default DIR: final/tiktok_dataset)")
+    p.set_defaults(func=cmd_clean)
+
+    for name, help_text in (("brands", "brand mention counts"),
+                            ("describe", "descriptive brand / product / hashtag stats"),
+                            ("models", "virality model comparison")):
+        p = sub.add_parser(name, help=help_text)
+        p.set_defaults(func=cmd_analysis)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # utils/paths.py reads these, so every stage sees the same locations
+    if args.data_dir:
+        os.environ["KBEAUTY_DATA_DIR"] = str(Path(args.data_dir).resolve())
+    if args.results_dir:
+        os.environ["KBEAUTY_RESULTS_DIR"] = str(Path(args.results_dir).resolve())
+    if str(PROJECT_ROOT) not in sys.path:
+        sys.path.insert(0, str(PROJECT_ROOT))
+    args.func(args)
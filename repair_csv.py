@@ -1,12 +1,13 @@
-import pandas as pd
+import sys
+from pathlib import Path
 
-df = pd.read_csv("data/raw/tiktok_discovery_fixed.csv", encoding="utf-8-sig")
+sys.path.append(str(Path(__file__).resolve().parent))
+from utils.csvrepair import repair_csv
+from utils.paths import data_dir
 
-# Drop extra unnamed columns
-df = df.loc[:, ~df.columns.str.contains("^Unnamed")]
+# Drops the extra unnamed columns (and repairs bad rows) in one streaming pass
+stats = repair_csv(data_dir() / "raw" / "tiktok_discovery_fixed.csv",
+                   data_dir() / "raw" / "tiktok_discovery_clean.csv",
+                   encoding="utf-8-sig")  # as before: opens cleanly in Excel
 
-# Save cleaned version
-df.to_csv("data/raw/tiktok_discovery_clean.csv", index=False, encoding="utf-8-sig")
-
-print(df.shape)
-print(df.columns)
+print(stats)
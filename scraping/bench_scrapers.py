@@ -0,0 +1,185 @@
+# scraping/bench_scrapers.py
+import asyncio
+import contextlib
+import json
+import time
+import sys
+from pathlib import Path
+from playwright.async_api import async_playwright
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.replay import ReplayServer, recorded_pages
+from utils.httpfetch import HttpFetcher
+from utils.paths import data_dir
+import tiktok_discovery_main
+import tiktok_discovery
+import tiktok_enrich_fix_captions
+
+# ---------------- CONFIG ----------------
+LATENCY_MS = (50, 300)     # replay server delay per response (min, max)
+FAIL_RATE = 0.0            # share of responses answered with a 503
+BLOCK_RATE = 0.0           # share of video/tag documents answered with a login wall
+CONCURRENCY = 3            # video pages in flight per variant
+MAX_VIDEOS = 50            # recorded video pages used per variant
+SEED = 7                   # replay randomness, so runs are reproducible
+PACING = (False, True)     # bench each variant without / with its human pauses and popup waits
+# ---------------------------------------
+
+# scraper sleeps that aren't fetch/extract work: human pauses, mouse moves and
+# popup waits (the replayed pages have no popups, so those just time out)
+PACING_HOOKS = ("human_pause", "mimic_human_on_page", "accept_cookies_if_present",
+                "dismiss_open_app_popup", "dismiss_interest_popup")
+SCRAPER_MODULES = (tiktok_discovery_main, tiktok_discovery, tiktok_enrich_fix_captions)
+
+# scraper variant -> scrape_video_page(context, url)
+VARIANTS = {
+    "main": tiktok_discovery_main.scrape_video_page,
+    "discovery": tiktok_discovery.scrape_video_page,
+    "enrich_fix_captions": tiktok_enrich_fix_captions.scrape_video_page,
+}
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+async def _skip(*args, **kwargs):
+    return None
+
+
+@contextlib.contextmanager
+def paced(enabled):
+    """With enabled=False, the scrapers' PACING_HOOKS return at once for the duration."""
+    saved = []
+    if not enabled:
+        for mod in SCRAPER_MODULES:
+            for name in PACING_HOOKS:
+                if hasattr(mod, name):
+                    saved.append((mod, name, getattr(mod, name)))
+                    setattr(mod, name, _skip)
+    try:
+        yield
+    finally:
+        for mod, name, fn in saved:
+            setattr(mod, name, fn)
+
+
+def row_ok(row):
+    return (bool(row) and not str(row.get("Caption") or "").startswith("[WARNING]")
+            and row.get("Like_Count") is not None)
+
+
+async def bench_videos(context, scrape, urls):
+    sem = asyncio.Semaphore(CONCURRENCY)
+    latencies, ok = [], 0
+
+    async def _one(url):
+        nonlocal ok
+        async with sem:
+            start = time.perf_counter()
+            try:
+                row = await scrape(context, url)
+            except Exception:
+                row = None
+            latencies.append((time.perf_counter() - start) * 1000)
+            ok += row_ok(row)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_one(u) for u in urls))
+    elapsed = time.perf_counter() - start
+    return {
+        "pages": len(urls),
+        "videos_per_min": round(len(urls) / elapsed * 60, 1) if elapsed else None,
+        "p50_ms": round(percentile(latencies, 50)),
+        "p95_ms": round(percentile(latencies, 95)),
+        "success_rate": round(ok / len(urls), 3),
+    }
+
+
+async def bench_tag_pages(context, tag_urls):
+    latencies, links = [], 0
+    for url in tag_urls:
+        page = await context.new_page()
+        start = time.perf_counter()
+        try:
+            await page.goto(url, timeout=60000)
+            links += len(await tiktok_discovery_main.collect_video_links(
+                page, max_items=tiktok_discovery_main.MAX_VIDEOS_PER_TAG, max_scrolls=3, pause=0.2))
+        except Exception:
+            pass
+        latencies.append((time.perf_counter() - start) * 1000)
+        await page.close()
+    return {
+        "pages": len(tag_urls),
+        "links": links,
+        "p50_ms": round(percentile(latencies, 50)) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95)) if latencies else None,
+    }
+
+
+def http_fast_path(server):
+    """Variant: HTTP fetch through the replay server first, main's page visit as fallback."""
+    fetcher = HttpFetcher(rewrite=server.url_for)
+
+    async def scrape(context, url):
+        row = await fetcher.fetch_row(url, tiktok_discovery_main.video_id_from_url(url))
+        return row or await tiktok_discovery_main.scrape_video_page(context, url)
+    return fetcher, scrape
+
+
+async def main():
+    replay_dir = data_dir() / "replay"
+    tag_urls, video_urls = recorded_pages(replay_dir)
+    if not video_urls:
+        print(f"No recorded video pages in {replay_dir}; run record_replay.py first.")
+        return
+    video_urls = sorted(video_urls)[:MAX_VIDEOS]
+
+    server = ReplayServer(replay_dir, latency_ms=LATENCY_MS, fail_rate=FAIL_RATE,
+                          block_rate=BLOCK_RATE, seed=SEED).start()
+    results = {"config": {"latency_ms": LATENCY_MS, "fail_rate": FAIL_RATE, "block_rate": BLOCK_RATE,
+                          "concurrency": CONCURRENCY, "videos": len(video_urls), "pacing": PACING}}
+    runs = []  # (result name, variant, pacing on)
+
+    fetcher, VARIANTS["http_fast_path"] = http_fast_path(server)
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        for name, scrape in VARIANTS.items():
+            for pacing in PACING:
+                run = f"{name}+pacing" if pacing else name
+                # fresh context per run so no cache carries over
+                context = await browser.new_context()
+                await server.install(context)
+                with paced(pacing):
+                    results[run] = await bench_videos(context, scrape, video_urls)
+                await context.close()
+                runs.append(run)
+        context = await browser.new_context()
+        await server.install(context)
+        results["collect_video_links"] = await bench_tag_pages(context, tag_urls)
+        await context.close()
+        await browser.close()
+    await fetcher.close()
+    server.stop()
+    results["http_fast_path_fallback_rate"] = round(fetcher.fallback_rate, 3)
+
+    print(server.summary())
+    print(fetcher.summary())
+    print(f"{'variant':<28}{'videos/min':>11}{'p50 ms':>9}{'p95 ms':>9}{'success':>9}")
+    for name in runs:
+        r = results[name]
+        print(f"{name:<28}{r['videos_per_min']:>11}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['success_rate']:>9.0%}")
+    t = results["collect_video_links"]
+    print(f"collect_video_links: {t['links']} links from {t['pages']} tag pages, "
+          f"p50 {t['p50_ms']} ms, p95 {t['p95_ms']} ms")
+
+    out = data_dir() / "bench" / f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(results, indent=2))
+    print(f"Saved -> {out}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,52 @@
+# scraping/record_replay.py
+import asyncio
+import sys
+from pathlib import Path
+from playwright.async_api import async_playwright
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.replay import Recorder
+from utils.paths import data_dir
+from tiktok_discovery_main import (
+    collect_video_links, scrape_video_page, accept_cookies_if_present,
+    dismiss_open_app_popup, dismiss_interest_popup, HASHTAGS, MAX_SCROLLS, SCROLL_PAUSE,
+)
+
+# ---------------- CONFIG ----------------
+VIDEOS_PER_TAG = 10        # video pages recorded per tag page
+# ---------------------------------------
+
+# Records tag pages, video pages and their XHRs from a live run so
+# bench_scrapers.py can replay them offline.
+async def main():
+    recorder = Recorder(data_dir() / "replay")
+
+    async with async_playwright() as p:
+        context = await p.chromium.launch_persistent_context(
+            user_data_dir=str(Path.home() / "tiktok_profile"),
+            headless=False,
+            args=["--disable-blink-features=AutomationControlled"]
+        )
+        recorder.attach(context)
+
+        for tag in HASHTAGS:
+            page = await context.new_page()
+            await page.goto(f"https://www.tiktok.com/tag/{tag}", timeout=60000)
+            await accept_cookies_if_present(page)
+            await dismiss_open_app_popup(page)
+            await dismiss_interest_popup(page)
+            links = await collect_video_links(page, max_items=VIDEOS_PER_TAG,
+                                              max_scrolls=MAX_SCROLLS, pause=SCROLL_PAUSE)
+            await page.close()
+            print(f"{tag}: recording {len(links)} video pages")
+            for url in links:
+                try:
+                    await scrape_video_page(context, url)
+                except Exception as e:
+                    print(f"  failed on {url}: {e!r}")
+
+        await context.close()
+    await recorder.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
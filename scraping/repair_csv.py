@@ -1,19 +1,18 @@
-import csv
+import sys
+from pathlib import Path
 
-file = "/Users/clarason/Desktop/kbeauty-virality-to-sales/data/raw/tiktok_discovery.csv"
-fixed_file = file  # overwrite same file
-
-rows = []
-with open(file, "r", encoding="utf-8", errors="replace") as f:
-    reader = csv.reader(f)
-    for row in reader:
-        rows.append(row)
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.csvrepair import repair_csv
+from utils.paths import data_dir
 
-print(f"Read {len(rows)} rows (may include messy captions).")
+# Streams the file through utils/csvrepair.py and swaps it in atomically,
+# so a crash mid-run leaves the original untouched.
+file = data_dir() / "raw" / "tiktok_discovery.csv"
+fixed_file = file  # overwrite same file
 
-# Re-save with strict quoting
-with open(fixed_file, "w", encoding="utf-8", newline="") as f:
-    writer = csv.writer(f, quoting=csv.QUOTE_ALL)
-    writer.writerows(rows)
+if len(sys.argv) > 1:
+    file = fixed_file = Path(sys.argv[1])
+if len(sys.argv) > 2:
+    fixed_file = Path(sys.argv[2])
 
-print(f"Re-saved file with quoting enforced: {fixed_file}")
+repair_csv(file, fixed_file)
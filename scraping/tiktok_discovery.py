@@ -1,37 +1,47 @@
 # scraping/tiktok_discovery.py
-import asyncio, re, sys, json, csv
+import asyncio, sys
 from datetime import datetime
 from pathlib import Path
-import pandas as pd
 from playwright.async_api import async_playwright
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from utils.idgen import make_id
+from utils.helpers import extract_hashtags_from_text, normalize_count, video_id_from_url
+from utils.paths import data_dir, raw_dataset_dir
+from utils.workers import run_pool, claim_video_id
+from utils.feed import FeedCapture
+from utils.routing import RoutePolicy
+from utils.harvest import harvest_new_links
+from utils.extract import extract_video_fields
+from utils.captions import CaptionEngine
+from utils.readiness import wait_for_video_data, ReadinessStats
+from utils.seen_index import SeenIndex
+from utils.writer import RowWriter
+from utils import parquet_store
+from utils.timing import StageTimer
+from utils.pagepool import PagePool
 
 # ---------------- CONFIG ----------------
 HASHTAGS = ["kbeauty, koreanskincare"]#["kbeautymakeup","koreanmakeup", "kmakeup", "koreanskincare","koreanskincareproducts", "kbeauty","koreanskincaretips","koreanskincareproducts", "koreanskincareroutine"]
 MAX_VIDEOS_PER_TAG = 200
 MAX_SCROLLS = 500
 SCROLL_PAUSE = 2.5
+VIDEO_CONCURRENCY = 3      # video pages open at once in the shared context
+HOST_CONCURRENCY = 2       # politeness cap: in-flight requests per host
+HOST_MIN_INTERVAL = 1.0    # politeness cap: seconds between page starts per host
+USE_FEED_CAPTURE = True    # fill rows from the tag page's item-list XHRs, visit only the rest
+READY_TIMEOUT_MS = 5000    # stop waiting for video data after this long
+WRITE_PARQUET = True       # also append each tag's rows to the raw Parquet dataset (raw/tiktok_dataset)
+BLOCK_RESOURCE_TYPES = ("media", "image", "font")  # aborted via page.route; () to load everything
+PAGE_MAX_NAVIGATIONS = 50  # replace a pooled video page after this many videos
+PAGE_MEMORY_MB = 400       # ... or once its JS heap grows past this
+CONTEXT_MAX_NAVIGATIONS = 600  # relaunch the profile context (cookies kept) after this many videos
+CONTEXT_MEMORY_MB = 1500   # ... or once the pooled pages' heaps add up to this
 # ---------------------------------------
 
-def extract_hashtags_from_text(text: str):
-    return [h.lower() for h in re.findall(r"#([A-Za-z0-9_]+)", text or "")]
-
-def normalize_count(val):
-    if val is None:
-        return None
-    s = str(val).strip().upper().replace(",", "")
-    try:
-        if s.endswith("K"):
-            return int(float(s[:-1]) * 1_000)
-        if s.endswith("M"):
-            return int(float(s[:-1]) * 1_000_000)
-        if s.endswith("B"):
-            return int(float(s[:-1]) * 1_000_000_000)
-        return int(s)
-    except:
-        return val
+READINESS = ReadinessStats()
+CAPTIONS = CaptionEngine()
+TIMING = StageTimer()
 
 async def accept_cookies_if_present(page):
     try:
@@ -46,16 +56,13 @@ async def accept_cookies_if_present(page):
             pass
 
 async def collect_video_links(page, max_items=200, max_scrolls=200, pause=2.0):
-    urls = set()
+    urls = {}  # dict keeps discovery order deterministic
     last_count = -1
     stagnant_loops = 0
 
     for i in range(max_scrolls):
-        anchors = await page.query_selector_all('a[href*="/video/"]')
-        for a in anchors:
-            href = await a.get_attribute("href")
-            if href and "/video/" in href:
-                urls.add(href.split("?")[0])
+        for href in await harvest_new_links(page):
+            urls.setdefault(href, None)
 
         if len(urls) >= max_items:
             break
@@ -74,227 +81,194 @@ async def collect_video_links(page, max_items=200, max_scrolls=200, pause=2.0):
 
     return list(urls)[:max_items]
 
-async def scrape_video_page(context, url):
-    page = await context.new_page()
-    await page.goto(url, timeout=60000)
-    await page.wait_for_load_state("domcontentloaded")
+async def scrape_video_page(context, url, pages=None):
+    # pages: a PagePool to borrow a reused page from; otherwise one fresh page per video
+    if pages is not None:
+        async with pages.lease() as page:
+            return await scrape_open_page(page, url)
 
-    data = {"URL": url}
-    data["TikTok_Video_ID"] = url.split("/")[-1].split("?")[0]
+    with TIMING.stage("new_page", url=url):
+        page = await context.new_page()
+    try:
+        return await scrape_open_page(page, url)
+    finally:
+        with TIMING.stage("close", url=url):
+            await page.close()
 
-    caption = None
-    for attempt in range(5):
-        try:
-            s = await page.query_selector('script#SIGI_STATE')
-            if s:
-                raw = await s.inner_text()
-                state = json.loads(raw)
-                item_mod = state.get("ItemModule") or {}
-                if item_mod:
-                    first_id = next(iter(item_mod.keys()))
-                    caption = (item_mod.get(first_id) or {}).get("desc")
-                    if caption and "Sign up for an account" not in caption:
-                        break
-        except Exception:
-            pass
-        await asyncio.sleep(1)
-
-    if not caption:
-        try:
-            m = await page.query_selector('meta[name="description"]')
-            if m:
-                caption = await m.get_attribute("content")
-        except:
-            pass
+async def scrape_open_page(page, url):
+    with TIMING.stage("goto", url=url):
+        await page.goto(url, timeout=60000)
+    with TIMING.stage("domcontentloaded", url=url):
+        await page.wait_for_load_state("domcontentloaded")
 
+    data = {"URL": url}
+    data["TikTok_Video_ID"] = video_id_from_url(url)
+
+    with TIMING.stage("state_wait", url=url):
+        ready = await wait_for_video_data(page, timeout=READY_TIMEOUT_MS)
+    READINESS.record(url, ready)
+    with TIMING.stage("extraction", url=url):
+        fields = await extract_video_fields(page, data["TikTok_Video_ID"], caption=False)
+        caption, _ = await CAPTIONS.run(page, data["TikTok_Video_ID"])
     if not caption:
         caption = "[WARNING] Caption missing or blocked"
 
     data["Caption"] = caption
     hashtags = extract_hashtags_from_text(caption or "")
     data["Hashtags"] = ",".join(sorted(set(hashtags)))
-
-    # author
-    author = None
-    for sel in [
-        'a[href^="/@"] span[data-e2e="browse-username"]',
-        'span[data-e2e="browse-username"]',
-        'a[href^="/@"]'
-    ]:
-        try:
-            el = await page.query_selector(sel)
-            if el:
-                txt = (await el.inner_text() or "").strip()
-                if txt:
-                    author = txt.lstrip("@")
-                    break
-        except:
-            continue
-    data["Author"] = author
-
-    # upload date
-    upload_date = None
-    try:
-        t = await page.query_selector("span time")
-        if t:
-            iso = await t.get_attribute("datetime")
-            if iso:
-                upload_date = iso
-    except:
-        pass
-    data["Upload_Date"] = upload_date
-
-    async def get_text(selectors):
-        for sel in selectors:
-            try:
-                el = await page.query_selector(sel)
-                if el:
-                    txt = await el.inner_text()
-                    if txt:
-                        return txt.strip()
-            except:
-                continue
-        return None
-
-    like_txt = await get_text(['strong[data-e2e="like-count"]'])
-    comment_txt = await get_text(['strong[data-e2e="comment-count"]'])
-    share_txt = await get_text(['strong[data-e2e="share-count"]'])
-
-    data["Like_Count"] = normalize_count(like_txt)
-    data["Comment_Count"] = normalize_count(comment_txt)
-    data["Share_Count"] = normalize_count(share_txt)
-
-    await page.close()
+    data["Author"] = fields.get("Author")
+    data["Upload_Date"] = fields.get("Upload_Date")
+    data["Like_Count"] = normalize_count(fields.get("Like_Count"))
+    data["Comment_Count"] = normalize_count(fields.get("Comment_Count"))
+    data["Share_Count"] = normalize_count(fields.get("Share_Count"))
     return data
 
-async def scrape_hashtag(context, tag, max_items, seen_ids):
+async def scrape_hashtag(context, tag, max_items, seen_ids, pages=None):
+    TIMING.bind(tag=tag)
+    tag_url = f"https://www.tiktok.com/tag/{tag}"
     page = await context.new_page()
-    await page.goto(f"https://www.tiktok.com/tag/{tag}", timeout=60000)
-    await accept_cookies_if_present(page)
-
-    urls = await collect_video_links(page, max_items=max_items, max_scrolls=MAX_SCROLLS, pause=SCROLL_PAUSE)
-    await page.close()
+    feed = FeedCapture(page) if USE_FEED_CAPTURE else None
+    with TIMING.stage("goto", url=tag_url):
+        await page.goto(tag_url, timeout=60000)
+    with TIMING.stage("popups", url=tag_url):
+        await accept_cookies_if_present(page)
+
+    with TIMING.stage("scroll", url=tag_url):
+        urls = await collect_video_links(page, max_items=max_items, max_scrolls=MAX_SCROLLS, pause=SCROLL_PAUSE)
+        if feed:
+            await feed.drain()
+    with TIMING.stage("close", url=tag_url):
+        await page.close()
 
     filtered = []
     for u in urls:
-        vid = u.split("/")[-1].split("?")[0]
-        if vid not in seen_ids:
+        if claim_video_id(seen_ids, video_id_from_url(u)):
             filtered.append(u)
-            seen_ids.add(vid)
 
-    print(f"{tag}: {len(filtered)} video links to scrape")
+    from_feed = {}
+    if feed:
+        for u in filtered:
+            row = feed.row_for(video_id_from_url(u), url=u)
+            if row:
+                from_feed[u] = row
+    to_visit = [u for u in filtered if u not in from_feed]
 
-    results = []
-    for i, url in enumerate(filtered, 1):
-        print(f"  [{i}/{len(filtered)}] {url}")
-        details = await scrape_video_page(context, url)
-        details["Hashtag_Seed"] = tag
-        results.append(details)
+    print(f"{tag}: {len(filtered)} video links "
+          f"({len(from_feed)} from feed, {len(to_visit)} to scrape)")
+
+    async def _worker(i, url):
+        print(f"  [{i + 1}/{len(to_visit)}] {url}")
+        TIMING.bind(url=url)
+        try:
+            details = await scrape_video_page(context, url, pages)
+        except Exception:
+            # release the claim so a later run can retry this video
+            seen_ids.discard(video_id_from_url(url))
+            raise
+        return details
+
+    visited = await run_pool(
+        to_visit, _worker,
+        concurrency=VIDEO_CONCURRENCY,
+        per_host=HOST_CONCURRENCY,
+        host_interval=HOST_MIN_INTERVAL,
+    )
+    visited = dict(zip(to_visit, visited))
 
+    results = []
+    for u in filtered:
+        details = from_feed.get(u) or visited.get(u)
+        if details is not None:
+            details["Hashtag_Seed"] = tag
+            results.append(details)
     return results
 
 async def main():
-    project_root = Path(__file__).resolve().parents[1]
-    out_path = project_root / "data" / "raw" / "tiktok_discovery.csv"
-
-    seen_ids = set()
-    gid = 1
-
-    # Read existing CSV to keep track of seen IDs and gid counter
-    if out_path.exists():
-        existing = pd.read_csv(out_path, quoting=csv.QUOTE_ALL)
-        existing = existing.loc[:, ~existing.columns.str.contains("^Unnamed")]
-        if "TikTok_Video_ID" in existing.columns:
-            seen_ids = set(existing["TikTok_Video_ID"].astype(str))
-        if "Video_ID" in existing.columns and not existing.empty:
-            def _extract_num(s):
-                m = re.search(r"(\d+)$", str(s))
-                return int(m.group(1)) if m else 0
-            gid = int(existing["Video_ID"].dropna().map(_extract_num).max() or 0) + 1
+    out_path = data_dir() / "raw" / "tiktok_discovery.csv"
+
+    # Seen IDs and the gid counter come from the on-disk index, not the CSV
+    seen_ids = SeenIndex(out_path)
+    gid = seen_ids.next_seq()
+    TIMING.open(out_path.with_name("run_timing.jsonl"))
 
     columns = [
         "Video_ID","TikTok_Video_ID","Hashtag_Seed","Author","Caption",
         "Hashtags","Like_Count","Comment_Count","Share_Count","Upload_Date","URL"
     ]
+    parquet_dir = raw_dataset_dir()
+
+    def _on_flush(rows):
+        seen_ids.record([r["TikTok_Video_ID"] for r in rows], [r["Video_ID"] for r in rows])
+        if WRITE_PARQUET:
+            parquet_store.append_rows(parquet_dir, rows)
+
+    # Append-only; an existing file's header decides the column order
+    writer = RowWriter(out_path, columns, flush_every=MAX_VIDEOS_PER_TAG, on_flush=_on_flush)
 
     async with async_playwright() as p:
         PROFILE_DIR = Path.home() / "tiktok_profiles" / "scraper1"
-        context = await p.chromium.launch_persistent_context(
-            user_data_dir=str(PROFILE_DIR),
-            headless=False,
-            args=["--disable-blink-features=AutomationControlled"],
-            viewport={"width": 1280, "height": 800},
-            locale="en-US",
-            user_agent=("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                        "AppleWebKit/537.36 (KHTML, like Gecko) "
-                        "Chrome/140.0.0.0 Safari/537.36")
+        route_policy = RoutePolicy(block_types=BLOCK_RESOURCE_TYPES)
+
+        async def launch(storage_state=None):
+            # the profile dir keeps the session; the pool re-adds cookies on relaunch
+            ctx = await p.chromium.launch_persistent_context(
+                user_data_dir=str(PROFILE_DIR),
+                headless=False,
+                args=["--disable-blink-features=AutomationControlled"],
+                viewport={"width": 1280, "height": 800},
+                locale="en-US",
+                user_agent=("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                            "AppleWebKit/537.36 (KHTML, like Gecko) "
+                            "Chrome/140.0.0.0 Safari/537.36")
+            )
+            await route_policy.install(ctx)
+            return ctx
+
+        # video pages are reused; the context is relaunched on memory / navigation watermarks
+        pages = PagePool(
+            launch, size=VIDEO_CONCURRENCY,
+            max_navigations=PAGE_MAX_NAVIGATIONS, page_memory_mb=PAGE_MEMORY_MB,
+            context_max_navigations=CONTEXT_MAX_NAVIGATIONS, context_memory_mb=CONTEXT_MEMORY_MB,
         )
+        await pages.start()
 
         for tag in HASHTAGS:
             rows = []
-            items = await scrape_hashtag(context, tag, MAX_VIDEOS_PER_TAG, seen_ids)
+            # tag pages are closed before any video is visited, so a relaunch never cuts one off
+            items = await scrape_hashtag(pages.context, tag, MAX_VIDEOS_PER_TAG, seen_ids, pages)
             for r in items:
                 r["Video_ID"] = make_id(gid)
-                rows.append(r)
-                gid += 1
+                if writer.write(r):  # duplicates / rows without an ID don't use up a Video_ID
+                    rows.append(r)
+                    gid += 1
 
             # ✅ Only save if we actually scraped something
             if rows:
-                df = pd.DataFrame(rows, columns=columns).dropna(how="all")
-                df.drop_duplicates(subset=["TikTok_Video_ID"], inplace=True)
-
-                if out_path.exists():
-                    with open(out_path, "a", newline="") as f:
-                        if f.tell() > 0:
-                            f.write("\n")
-                        df.to_csv(f, index=False, header=False,
-                                quoting=csv.QUOTE_ALL, escapechar="\\")
-                    print(f"Appended {len(df)} rows from #{tag} -> {out_path}")
-                else:
-                    df.to_csv(out_path, index=False,
-                            quoting=csv.QUOTE_ALL, escapechar="\\")
-                    print(f"Wrote {len(df)} rows from #{tag} -> {out_path}")
+                writer.flush()
+                print(f"Appended {len(rows)} rows from #{tag} -> {out_path}")
 
                 print("\nPreview of first 5 rows just collected:")
-                print(df.head(5).to_string(index=False))
+                import pandas as pd  # only needed for the preview table
+                print(pd.DataFrame(rows, columns=columns).head(5).to_string(index=False))
             else:
                 print(f"(no new rows from #{tag})")
 
-
-
-        await context.close()
-
-
-    columns = [
-        "Video_ID","TikTok_Video_ID","Hashtag_Seed","Author","Caption",
-        "Hashtags","Like_Count","Comment_Count","Share_Count","Upload_Date","URL"
-    ]
-    df = pd.DataFrame(rows, columns=columns).dropna(how="all")
-
-    if not df.empty:
-        df.drop_duplicates(subset=["TikTok_Video_ID"], inplace=True)
-
-    print("\nPreview of first 5 rows collected:")
-    if not df.empty:
-        print(df.head(5).to_string(index=False))
-    else:
-        print("(no new rows)")
-
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    if df.empty:
-        print(f"No new rows to append -> {out_path}")
-        return
-
-    if out_path.exists():
-        existing = pd.read_csv(out_path, quoting=csv.QUOTE_ALL)
-        df = df[existing.columns]  # enforce same order
-        df.to_csv(out_path, index=False, mode="a", header=False,
-                  quoting=csv.QUOTE_ALL, escapechar="\\")
-        print(f"Appended {len(df)} new rows -> {out_path}")
-    else:
-        df.to_csv(out_path, index=False, quoting=csv.QUOTE_ALL, escapechar="\\")
-        print(f"Wrote {len(df)} rows -> {out_path}")
+        await pages.close()
+        await pages.context.close()
+
+    writer.close()
+    seen_ids.close()
+    if WRITE_PARQUET and writer.written:
+        parquet_store.compact(parquet_dir)
+
+    print(route_policy.summary())
+    print(READINESS.summary())
+    print(pages.summary())
+    print(TIMING.summary())
+    TIMING.write_prometheus(out_path.with_name("run_timing.prom"))
+    TIMING.close()
+    CAPTIONS.dump(out_path.with_name("caption_strategies.json"))
+    print(f"Run summary: {writer.written} new rows -> {out_path}")
 
 if __name__ == "__main__":
     asyncio.run(main())
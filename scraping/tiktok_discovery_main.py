@@ -1,47 +1,76 @@
 # scraping/tiktok_discovery.py
 import asyncio
 import random
-import re
 import sys
-import json
-from datetime import datetime
 from pathlib import Path
-import pandas as pd
 from playwright.async_api import async_playwright
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from utils.idgen import make_id
+from utils.helpers import extract_hashtags_from_text, normalize_count, video_id_from_url
+from utils.paths import data_dir, raw_dataset_dir
+from utils.workers import claim_video_id
+from utils.pipeline import run_pipeline
+from utils.pacing import RateController
+from utils.feed import FeedCapture
+from utils.routing import RoutePolicy
+from utils.harvest import harvest_new_links
+from utils.extract import extract_video_fields
+from utils.captions import CaptionEngine
+from utils.readiness import wait_for_video_data, ReadinessStats
+from utils.seen_index import SeenIndex
+from utils.journal import ScrapeJournal, DONE, FAILED, BLOCKED
+from utils.writer import RowWriter
+from utils.snapshots import SnapshotStore
+from utils.timing import StageTimer
+from utils.pagepool import PagePool
+from utils.httpfetch import HttpFetcher
+from utils import parquet_store
 
 # ---------------- CONFIG ----------------
 HASHTAGS = ["kbeauty", "koreanskincare", "koreanskincareproducts"]
 MAX_VIDEOS_PER_TAG = 5     # change to 20+ for full runs
 MAX_SCROLLS = 10
 SCROLL_PAUSE = 1.2
-SIGI_RETRY = 10            # increased retry attempts (step 1)
+READY_TIMEOUT_MS = 10000   # stop waiting for video data after this long
 MIN_INTERACTION_DELAY = 0.6
 MAX_INTERACTION_DELAY = 1.8
+VIDEO_CONCURRENCY = 3      # video pages open at once in the shared context (starting value)
+MAX_VIDEO_CONCURRENCY = 6  # ceiling the rate controller may grow concurrency to
+START_RATE = 0.5           # video page starts per second; adapted from block signals
+HOST_CONCURRENCY = 6       # politeness ceiling: video pages in flight on tiktok.com; the pacer adapts below it
+HOST_MIN_INTERVAL = 0.5    # politeness ceiling: min seconds between page starts (caps the pacer's rate)
+USE_FEED_CAPTURE = True    # fill rows from the tag page's item-list XHRs, visit only the rest
+FEED_WAIT_S = 5.0          # max wait for an in-flight item-list parse before visiting the page
+USE_HTTP_FAST_PATH = True  # try a plain HTTP fetch of the video page before opening it in Chromium
+HTTP_CONNECTIONS = 8       # pooled keep-alive connections for the HTTP fast path
+BLOCK_RESOURCE_TYPES = ("media", "image", "font")  # aborted via page.route; () to load everything
+PIPELINE_WINDOW = 20       # max links between the tag harvester and the writer
+WRITE_BATCH = 25           # rows appended to the CSV per write
+WRITE_PARQUET = True       # also append each batch to the raw Parquet dataset (raw/tiktok_dataset)
+PAGE_MAX_NAVIGATIONS = 50  # replace a pooled video page after this many videos
+PAGE_MEMORY_MB = 400       # ... or once its JS heap grows past this
+CONTEXT_MAX_NAVIGATIONS = 600  # restart the video context (cookies kept) after this many videos
+CONTEXT_MEMORY_MB = 1500   # ... or once the pooled pages' heaps add up to this
 # ---------------------------------------
 
-def extract_hashtags_from_text(text: str):
-    return [h.lower() for h in re.findall(r"#([A-Za-z0-9_]+)", text or "")]
+COLUMNS = [
+    "Video_ID","TikTok_Video_ID","Hashtag_Seed","Author","Caption",
+    "Hashtags","Like_Count","Comment_Count","Share_Count","Upload_Date","URL"
+]
 
-def normalize_count(val):
-    if val is None:
-        return None
-    s = str(val).strip().upper().replace(",", "")
-    try:
-        if s.endswith("K"):
-            return int(float(s[:-1]) * 1_000)
-        if s.endswith("M"):
-            return int(float(s[:-1]) * 1_000_000)
-        if s.endswith("B"):
-            return int(float(s[:-1]) * 1_000_000_000)
-        return int(s)
-    except:
-        return val
+READINESS = ReadinessStats()
+CAPTIONS = CaptionEngine()
+# all video pages share one host, so the per-host politeness caps are the pacer's ceilings
+PACER = RateController(rate=START_RATE, concurrency=VIDEO_CONCURRENCY,
+                       max_concurrency=min(MAX_VIDEO_CONCURRENCY, HOST_CONCURRENCY),
+                       max_rate=1.0 / HOST_MIN_INTERVAL)
+TIMING = StageTimer()
 
 async def human_pause(min_s=MIN_INTERACTION_DELAY, max_s=MAX_INTERACTION_DELAY):
-    await asyncio.sleep(random.uniform(min_s, max_s))
+    # pauses stretch when the pacer has backed off and shrink when healthy
+    with TIMING.stage("human_pause"):
+        await asyncio.sleep(random.uniform(min_s, max_s) * PACER.pause_scale)
 
 async def accept_cookies_if_present(page):
     try:
@@ -92,257 +121,236 @@ async def mimic_human_on_page(page):
     except Exception:
         pass
 
-async def collect_video_links(page, max_items=20, max_scrolls=60, pause=1.2):
-    urls, seen = set(), 0
+async def collect_video_links(page, max_items=20, max_scrolls=60, pause=1.2, on_link=None):
+    urls, seen = {}, 0  # dict keeps discovery order deterministic
+
+    async def _take(hrefs):
+        for href in hrefs:
+            if href not in urls and len(urls) < max_items:
+                urls[href] = None
+                if on_link:
+                    await on_link(href)
+
     for _ in range(max_scrolls):
-        anchors = await page.query_selector_all('a[href*="/video/"]')
-        for a in anchors:
-            href = await a.get_attribute("href")
-            if href and "/video/" in href:
-                urls.add(href.split("?")[0])
+        await _take(await harvest_new_links(page))
         if len(urls) >= max_items:
             break
         if len(urls) == seen:
             await page.mouse.wheel(0, 2000)
             await asyncio.sleep(pause)
-            anchors = await page.query_selector_all('a[href*="/video/"]')
-            for a in anchors:
-                href = await a.get_attribute("href")
-                if href and "/video/" in href:
-                    urls.add(href.split("?")[0])
+            await _take(await harvest_new_links(page))
             if len(urls) == seen:
                 print("No new videos, stopping scroll early.")
                 break
         seen = len(urls)
         await page.mouse.wheel(0, 4000)
         await asyncio.sleep(pause + random.uniform(0, 0.6))
-    return list(urls)[:max_items]
-
-async def scrape_video_page(context, url):
-    page = await context.new_page()
-
-    # Inject small stealth script to hide webdriver and some automation signs
+    return list(urls)
+
+# Small stealth script to hide webdriver and some automation signs
+STEALTH_JS = """
+// hide webdriver
+Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+// pretend to have plugins/languages
+Object.defineProperty(navigator, 'plugins', {get: () => [1,2,3,4,5]});
+Object.defineProperty(navigator, 'languages', {get: () => ['en-US','en']});
+"""
+
+async def scrape_video_page(context, url, pages=None):
+    # pages: a PagePool to borrow a reused page from; otherwise one fresh page per video
+    if pages is not None:
+        async with pages.lease() as page:
+            return await scrape_open_page(page, url)
+
+    with TIMING.stage("new_page", url=url):
+        page = await context.new_page()
     try:
-        await page.add_init_script(
-            """
-            // hide webdriver
-            Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-            // pretend to have plugins/languages
-            Object.defineProperty(navigator, 'plugins', {get: () => [1,2,3,4,5]});
-            Object.defineProperty(navigator, 'languages', {get: () => ['en-US','en']});
-            """
-        )
+        await page.add_init_script(STEALTH_JS)
     except Exception:
         pass
-
-    await page.goto(url, timeout=60000)
-    await page.wait_for_load_state("domcontentloaded")
+    try:
+        return await scrape_open_page(page, url)
+    finally:
+        with TIMING.stage("close", url=url):
+            await page.close()
+
+async def scrape_open_page(page, url):
+    with TIMING.stage("goto", url=url):
+        await page.goto(url, timeout=60000)
+    with TIMING.stage("domcontentloaded", url=url):
+        await page.wait_for_load_state("domcontentloaded")
     await human_pause(0.4, 1.0)
     await mimic_human_on_page(page)
 
     data = {"URL": url}
-    data["TikTok_Video_ID"] = url.split("/")[-1].split("?")[0]
+    data["TikTok_Video_ID"] = video_id_from_url(url)
 
-    caption = None
+    # --- Wait for the state JSON (or an early block / login wall) ---
+    with TIMING.stage("state_wait", url=url):
+        ready = await wait_for_video_data(page, timeout=READY_TIMEOUT_MS)
+    READINESS.record(url, ready)
+    if ready.status != "ready":
+        print(f"    page not ready ({ready.status}) after {ready.elapsed_ms} ms")
 
-    # --- Retry loop for JSON state (increased attempts) ---
-    for attempt in range(SIGI_RETRY):
-        try:
-            s = await page.query_selector('script#SIGI_STATE')
-            if s:
-                raw = await s.inner_text()
-                state = json.loads(raw)
-                item_mod = state.get("ItemModule") or {}
-                if item_mod:
-                    first_id = next(iter(item_mod.keys()))
-                    caption = (item_mod.get(first_id) or {}).get("desc")
-                    if caption and "Sign up for an account" not in caption:
-                        break
-        except Exception:
-            pass
-        await asyncio.sleep(1)
-
-    # --- Fallbacks if caption still missing ---
-    if not caption:
-        try:
-            m = await page.query_selector('meta[name="description"]')
-            if m:
-                caption = await m.get_attribute("content")
-        except:
-            pass
-
-    if not caption:
-        try:
-            btn_more = await page.query_selector('button[data-e2e="expand-desc"], button:has-text("More")')
-            if btn_more:
-                try:
-                    await btn_more.click()
-                    await page.wait_for_timeout(300)
-                except:
-                    pass
-            for sel in [
-                'h1[data-e2e="browse-video-desc"]',
-                'div[data-e2e="browse-video-desc"]',
-                'span[data-e2e="browse-video-desc"]',
-                'div[data-e2e="video-desc"]',
-            ]:
-                el = await page.query_selector(sel)
-                if el:
-                    txt = (await el.inner_text() or "").strip()
-                    if txt and "Sign up for an account" not in txt:
-                        caption = txt
-                        break
-        except:
-            pass
+    with TIMING.stage("extraction", url=url):
+        fields = await extract_video_fields(page, data["TikTok_Video_ID"], caption=False)
+        # no point clicking around on a walled page
+        skip = ("expand_desc",) if ready.status in ("blocked", "login") else ()
+        caption, _ = await CAPTIONS.run(page, data["TikTok_Video_ID"], skip=skip)
 
     if not caption:
         caption = "[WARNING] Caption missing or blocked"
 
     data["Caption"] = caption
 
-    hashtags = []
-    try:
-        tag_links = await page.query_selector_all('a[href*="/tag/"]')
-        for t in tag_links:
-            txt = await t.inner_text()
-            if txt and txt.startswith("#"):
-                hashtags.append(txt.strip("#").lower())
-    except:
-        pass
+    hashtags = fields.get("Hashtags") or []
     if not hashtags and caption:
         hashtags = extract_hashtags_from_text(caption)
     data["Hashtags"] = ",".join(sorted(set(hashtags)))
 
-    author = None
-    for sel in [
-        'a[href^="/@"] span[data-e2e="browse-username"]',
-        'span[data-e2e="browse-username"]',
-        'a[href^="/@"]'
-    ]:
-        try:
-            el = await page.query_selector(sel)
-            if el:
-                txt = (await el.inner_text() or "").strip()
-                if txt:
-                    author = txt.lstrip("@")
-                    break
-        except:
-            continue
-    data["Author"] = author
+    data["Author"] = fields.get("Author")
+    data["Upload_Date"] = fields.get("Upload_Date")
+    data["Like_Count"] = normalize_count(fields.get("Like_Count"))
+    data["Comment_Count"] = normalize_count(fields.get("Comment_Count"))
+    data["Share_Count"] = normalize_count(fields.get("Share_Count"))
 
-    upload_date = None
-    try:
-        t = await page.query_selector("span time")
-        if t:
-            iso = await t.get_attribute("datetime")
-            if iso:
-                upload_date = iso
-    except:
-        pass
-    if not upload_date:
-        try:
-            info = await page.query_selector('span[data-e2e="browser-nickname"]')
-            if info:
-                spans = await info.query_selector_all("span")
-                if spans:
-                    last = spans[-1]
-                    txt = (await last.inner_text() or "").strip()
-                    if re.fullmatch(r"\d{4}-\d{1,2}-\d{1,2}", txt):
-                        upload_date = txt
-                    elif re.fullmatch(r"\d{1,2}-\d{1,2}", txt):
-                        y = datetime.now().year
-                        m, d = [int(x) for x in txt.split("-")]
-                        upload_date = f"{y:04d}-{m:02d}-{d:02d}"
-        except:
-            pass
-    data["Upload_Date"] = upload_date
-
-    async def get_text(selectors):
-        for sel in selectors:
-            try:
-                el = await page.query_selector(sel)
-                if el:
-                    txt = await el.inner_text()
-                    if txt:
-                        return txt.strip()
-            except:
-                continue
-        return None
-
-    like_txt = await get_text(['strong[data-e2e="like-count"]', 'button[data-e2e="like-icon"] strong'])
-    comment_txt = await get_text(['strong[data-e2e="comment-count"]', 'button[data-e2e="comment-icon"] strong'])
-    share_txt = await get_text(['strong[data-e2e="share-count"]', 'button[data-e2e="share-icon"] strong'])
-
-    data["Like_Count"] = normalize_count(like_txt)
-    data["Comment_Count"] = normalize_count(comment_txt)
-    data["Share_Count"] = normalize_count(share_txt)
-
-    # small human-like pause before closing
+    PACER.record(
+        blocked=caption.startswith("[WARNING]") or ready.status in ("blocked", "login"),
+        timeout=ready.status == "timeout",
+        ttd_ms=ready.elapsed_ms,
+    )
+
+    # small human-like pause before moving on
     await human_pause(0.2, 0.8)
-    await page.close()
     return data
 
-async def scrape_hashtag(context, tag, max_items, seen_ids):
+async def harvest_tag(context, tag, max_items, seen_ids, emit, journal=None):
+    # Producer: emits (tag, url, feed) for each unseen link as soon as it shows up
+    TIMING.bind(tag=tag)
+    if journal and journal.harvested(tag):
+        # tag page already scrolled in an interrupted run: reuse its links
+        links = [u for u in journal.urls(tag) if claim_video_id(seen_ids, video_id_from_url(u))]
+        print(f"{tag}: {len(links)} video links from journal")
+        for u in links:
+            await emit((tag, u, None))
+        return
+
+    tag_url = f"https://www.tiktok.com/tag/{tag}"
     page = await context.new_page()
-    await page.goto(f"https://www.tiktok.com/tag/{tag}", timeout=60000)
-    await accept_cookies_if_present(page)
-    await dismiss_open_app_popup(page)
-    await dismiss_interest_popup(page)
+    feed = FeedCapture(page) if USE_FEED_CAPTURE else None
+    with TIMING.stage("goto", url=tag_url):
+        await page.goto(tag_url, timeout=60000)
+    with TIMING.stage("popups", url=tag_url):
+        await accept_cookies_if_present(page)
+        await dismiss_open_app_popup(page)
+        await dismiss_interest_popup(page)
     await human_pause()
     await mimic_human_on_page(page)
 
-    urls = await collect_video_links(page, max_items=max_items, max_scrolls=MAX_SCROLLS, pause=SCROLL_PAUSE)
-    await page.close()
-
-    filtered = []
-    for u in urls:
-        vid = u.split("/")[-1].split("?")[0]
-        if vid not in seen_ids:
-            filtered.append(u)
-            seen_ids.add(vid)
-
-    print(f"{tag}: {len(filtered)} video links to scrape")
-
-    results = []
-    for i, url in enumerate(filtered, 1):
-        print(f"  [{i}/{len(filtered)}] {url}")
-        details = await scrape_video_page(context, url)
-        details["Hashtag_Seed"] = tag
-        results.append(details)
-        # small randomized delay between video scrapes to look human
+    found = []
+
+    async def _on_link(url):
+        if claim_video_id(seen_ids, video_id_from_url(url)):
+            found.append(url)
+            await emit((tag, url, feed))
+
+    # includes time spent waiting for room in the pipeline window
+    with TIMING.stage("scroll", url=tag_url):
+        await collect_video_links(page, max_items=max_items, max_scrolls=MAX_SCROLLS,
+                                  pause=SCROLL_PAUSE * PACER.pause_scale, on_link=_on_link)
+        if feed:
+            await feed.drain()
+    with TIMING.stage("close", url=tag_url):
+        await page.close()
+    if journal:
+        journal.record_harvest(tag, found)
+    print(f"{tag}: {len(found)} video links harvested")
+
+async def scrape_link(context, job, seen_ids, journal=None, pages=None, http=None):
+    # Worker: row from the journal, the tag feed or a plain HTTP fetch if we can, else visit the page
+    tag, url, feed = job
+    TIMING.bind(url=url, tag=tag)
+    vid = video_id_from_url(url)
+    details = None
+    if journal and journal.is_done(url):
+        details = journal.row(url)
+    elif feed:
+        details = await feed.lookup(vid, url=url, timeout=FEED_WAIT_S)
+        if details and journal:
+            journal.mark(url, DONE, details)
+    if details is None and http:
+        details = await http.fetch_row(url, vid)  # paced like a page visit
+        if details and journal:
+            journal.mark(url, DONE, details)
+
+    if details is None:
+        print(f"  [{tag}] {url}")
+        try:
+            async with PACER.slot():
+                details = await scrape_video_page(context, url, pages)
+        except Exception as e:
+            if "Timeout" in type(e).__name__:
+                PACER.record(timeout=True)
+            # release the claim so a later run can retry this video
+            seen_ids.discard(vid)
+            if journal:
+                journal.mark(url, FAILED)
+            raise
+        if journal:
+            blocked = str(details.get("Caption", "")).startswith("[WARNING]")
+            journal.mark(url, BLOCKED if blocked else DONE, details)
+        # small randomized delay before this worker takes the next video
         await human_pause(0.8, 2.0)
-    return results
 
-async def main():
-    project_root = Path(__file__).resolve().parents[1]
-    out_path = project_root / "data" / "raw" / "tiktok_discovery.csv"
+    details["Hashtag_Seed"] = tag
+    return details
 
-    seen_ids = set()
-    gid = 1
+async def main():
+    out_path = data_dir() / "raw" / "tiktok_discovery.csv"
+
+    # seen ids and the gid counter come from the on-disk index, not the CSV
+    seen_ids = SeenIndex(out_path)
+    gid = seen_ids.next_seq()
+    # URL-level checkpoint: a crashed run restarts where it stopped
+    journal = ScrapeJournal(out_path.with_suffix(".journal.jsonl"))
+    TIMING.open(out_path.with_name("run_timing.jsonl"))
+
+    parquet_dir = raw_dataset_dir()
+    snapshots = SnapshotStore(out_path.with_name("tiktok_snapshots.sqlite"))
+
+    def _on_flush(rows):
+        # the index (and the raw Parquet dataset) learn each flushed batch
+        seen_ids.record([r["TikTok_Video_ID"] for r in rows], [r["Video_ID"] for r in rows])
+        if WRITE_PARQUET:
+            parquet_store.append_rows(parquet_dir, rows)
+        # discovery-time counts are the first engagement snapshot (see tiktok_refresh.py)
+        snapshots.add_rows(rows)
 
-    # load existing file to seed seen ids and the gid counter
-    if out_path.exists():
-        try:
-            existing = pd.read_csv(out_path, usecols=["Video_ID", "TikTok_Video_ID"])
-        except Exception:
-            existing = pd.read_csv(out_path)
-        if "TikTok_Video_ID" in existing.columns:
-            seen_ids = set(existing["TikTok_Video_ID"].astype(str))
-        def _extract_num(s):
-            m = re.search(r"(\d+)$", str(s))
-            return int(m.group(1)) if m else 0
-        if "Video_ID" in existing.columns and not existing.empty:
-            gid = int(existing["Video_ID"].dropna().map(_extract_num).max() or 0) + 1
-
-    rows = []
+    # append-only write (no overwrite)
+    writer = RowWriter(out_path, COLUMNS, flush_every=WRITE_BATCH, on_flush=_on_flush)
+    preview = []
     warning_count = 0
 
+    async def write_row(r):
+        # Writer: assigns Video_IDs in harvest order and appends in batches
+        nonlocal gid, warning_count
+        r["Video_ID"] = make_id(gid)
+        if not writer.write(r):
+            return  # no or duplicate TikTok_Video_ID: no Video_ID used up
+        gid += 1
+        if str(r.get("Caption", "")).startswith("[WARNING]"):
+            warning_count += 1
+        if len(preview) < 5:
+            preview.append(r)
+
     async with async_playwright() as p:
         browser = await p.chromium.launch_persistent_context(
             user_data_dir=str(Path.home() / "tiktok_profile"),
             headless=False,
             args=["--disable-blink-features=AutomationControlled"]
         )
+        route_policy = RoutePolicy(block_types=BLOCK_RESOURCE_TYPES)
+        await route_policy.install(browser)
 
         page = await browser.new_page()
         await page.goto("https://www.tiktok.com", timeout=60000)
@@ -356,63 +364,85 @@ async def main():
         else:
             ua = ua_base
 
-        context = await browser.new_context(
-            user_agent=ua,
-            viewport={"width": 1280, "height": 800},
-            locale="en-US"
+        async def new_context(storage_state=None):
+            ctx = await browser.new_context(
+                user_agent=ua,
+                viewport={"width": 1280, "height": 800},
+                locale="en-US",
+                storage_state=storage_state,
+            )
+            await route_policy.install(ctx)
+            return ctx
+
+        # tag pages live here; video pages come from the pool's own context,
+        # which it restarts (cookies kept) when memory or navigations pile up
+        context = await new_context()
+        pages = PagePool(
+            new_context, size=MAX_VIDEO_CONCURRENCY, init_script=STEALTH_JS,
+            max_navigations=PAGE_MAX_NAVIGATIONS, page_memory_mb=PAGE_MEMORY_MB,
+            context_max_navigations=CONTEXT_MAX_NAVIGATIONS, context_memory_mb=CONTEXT_MEMORY_MB,
         )
+        await pages.start(await context.storage_state())
+        http = None
+        if USE_HTTP_FAST_PATH:
+            http = await HttpFetcher.from_context(context, max_connections=HTTP_CONNECTIONS,
+                                                  headers={"User-Agent": ua}, pacer=PACER)
 
         # (optional) small initial delay to look less robotic
         await human_pause(0.5, 1.5)
 
-        for tag in HASHTAGS:
-            items = await scrape_hashtag(context, tag, MAX_VIDEOS_PER_TAG, seen_ids)
-            for r in items:
-                r["Video_ID"] = make_id(gid)
-                rows.append(r)
-                if r.get("Caption", "").startswith("[WARNING]"):
-                    warning_count += 1
-                gid += 1
+        async def produce(emit):
+            for tag in HASHTAGS:
+                await harvest_tag(context, tag, MAX_VIDEOS_PER_TAG, seen_ids, emit, journal)
+
+        # tag scrolling, video scraping and writing all overlap
+        await run_pipeline(
+            produce,
+            lambda job: scrape_link(context, job, seen_ids, journal, pages, http),
+            write_row,
+            concurrency=MAX_VIDEO_CONCURRENCY,  # PACER.slot() gates how many actually run
+            window=PIPELINE_WINDOW,
+        )
 
+        await pages.close()
+        await pages.context.close()
+        if http:
+            await http.close()
+            print(http.summary())
         await context.close()
         await browser.close()
 
-    df = pd.DataFrame(rows, columns=[
-        "Video_ID","TikTok_Video_ID","Hashtag_Seed","Author","Caption",
-        "Hashtags","Like_Count","Comment_Count","Share_Count","Upload_Date","URL"
-    ]).dropna(how="all")
+    writer.close()
+    written = writer.written
+    if WRITE_PARQUET and written:
+        parquet_store.compact(parquet_dir)
 
-    # dedup within the new batch just in case
-    if not df.empty:
-        df.drop_duplicates(subset=["TikTok_Video_ID"], inplace=True)
+    print(route_policy.summary())
+    print(READINESS.summary())
+    print(PACER.summary())
+    print(pages.summary())
+    print(TIMING.summary())
+    TIMING.write_prometheus(out_path.with_name("run_timing.prom"))
+    TIMING.close()
+    CAPTIONS.dump(out_path.with_name("caption_strategies.json"))
 
     print("\nPreview of first 5 rows collected:")
-    if not df.empty:
-        print(df.head(5).to_string(index=False))
+    if preview:
+        import pandas as pd  # only needed for the preview table
+        print(pd.DataFrame(preview, columns=COLUMNS).to_string(index=False))
     else:
         print("(no new rows)")
 
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    if df.empty:
+    if written:
+        print(f"Appended {written} new rows -> {out_path}")
+        print(f"Run summary: {written} new rows, {warning_count} warnings, total rows after append = {seen_ids.row_count}")
+    else:
         print(f"No new rows to append -> {out_path}")
         print(f"Run summary: 0 new rows, {warning_count} warnings")
-        return
-
-    # append-only write (no overwrite)
-    if out_path.exists():
-        df.to_csv(out_path, index=False, mode="a", header=False)
-        total_after = None
-        try:
-            total_after = len(pd.read_csv(out_path))
-        except Exception:
-            total_after = "unknown"
-        print(f"Appended {len(df)} new rows -> {out_path}")
-        print(f"Run summary: {len(df)} new rows, {warning_count} warnings, total rows after append = {total_after}")
-    else:
-        df.to_csv(out_path, index=False)
-        print(f"Wrote {len(df)} rows -> {out_path}")
-        print(f"Run summary: {len(df)} new rows, {warning_count} warnings")
+    journal.commit()
+    journal.close()
+    seen_ids.close()
+    snapshots.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,22 +1,40 @@
 # scraping/tiktok_discovery.py
-import asyncio, re, sys, json
+import asyncio, re, sys, json, time
 from datetime import datetime
 from pathlib import Path
-import pandas as pd
 from playwright.async_api import async_playwright
 
 # allow "from utils.idgen import make_id"
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 from utils.idgen import make_id
+from utils.paths import data_dir
+from utils.routing import RoutePolicy
+from utils.readiness import wait_for_video_data, ReadinessStats
+from utils.captions import CaptionEngine
+from utils.seen_index import SeenIndex
+from utils.writer import RowWriter
+from utils.timing import StageTimer
 
 # ---------------- CONFIG ----------------
 HASHTAGS = ["kbeauty", "viralkbeauty", "koreanskincareproducts"]
 MAX_VIDEOS_PER_TAG = 200
 MAX_SCROLLS = 60
 SCROLL_PAUSE = 1.2
-OUT_PATH = Path("tiktok_discovery.csv")
+OUT_PATH = data_dir() / "raw" / "tiktok_enrich_captions.csv"  # own schema: kept apart from the discovery CSV
+READY_TIMEOUT_MS = 8000    # stop waiting for video data after this long
+BLOCK_RESOURCE_TYPES = ("media", "image", "font")  # aborted via page.route; () to load everything
+WRITE_BATCH = 25           # rows appended to OUT_PATH per write
 # ---------------------------------------
 
+COLUMNS = [
+    "URL","TikTok_Video_ID","Caption","Author","Upload_Date",
+    "Like_Count","Comment_Count","Share_Count","Hashtags"
+]
+
+READINESS = ReadinessStats()
+CAPTIONS = CaptionEngine()
+TIMING = StageTimer()
+
 def extract_hashtags_from_text(text: str):
     return [h.lower() for h in re.findall(r"#([A-Za-z0-9_]+)", text or "")]
 
@@ -64,15 +82,18 @@ async def dismiss_interest_popup(page):
         pass
 
 async def scrape_video_page(context, url):
-    page = await context.new_page()
-    await page.goto(url, timeout=60000)
-    await page.wait_for_load_state("domcontentloaded")
+    with TIMING.stage("new_page", url=url):
+        page = await context.new_page()
+    with TIMING.stage("goto", url=url):
+        await page.goto(url, timeout=60000)
+    with TIMING.stage("domcontentloaded", url=url):
+        await page.wait_for_load_state("domcontentloaded")
 
     # Handle popups
-    await dismiss_interest_popup(page)
-    await accept_cookies_if_present(page)
-    await dismiss_open_app_popup(page)
-    await page.wait_for_timeout(1200)
+    with TIMING.stage("popups", url=url):
+        await dismiss_interest_popup(page)
+        await accept_cookies_if_present(page)
+        await dismiss_open_app_popup(page)
 
     data = {"URL": url}
     video_id = url.split("/")[-1].split("?")[0]
@@ -82,10 +103,17 @@ async def scrape_video_page(context, url):
     like_txt, comment_txt, share_txt = None, None, None
     hashtags = []
 
-    # --- JSON parsing from SIGI_STATE ---
-    for attempt in range(3):
+    with TIMING.stage("state_wait", url=url):
+        ready = await wait_for_video_data(page, timeout=READY_TIMEOUT_MS)
+    READINESS.record(url, ready)
+    extraction_start = time.perf_counter()
+
+    # --- Caption: cheapest working strategy first ---
+    caption, _ = await CAPTIONS.run(page, video_id)
+
+    # --- Author, stats and date from SIGI_STATE ---
+    if ready.status == "ready":
         try:
-            await page.wait_for_selector("script#SIGI_STATE", timeout=8000)
             s = await page.query_selector("script#SIGI_STATE")
             if s:
                 raw = await s.inner_text()
@@ -104,9 +132,6 @@ async def scrape_video_page(context, url):
                     )
 
                 if vid_data:
-                    # Caption
-                    caption = vid_data.get("desc") or caption
-
                     # Author (use best available)
                     author = (
                         vid_data.get("authorName")
@@ -128,23 +153,10 @@ async def scrape_video_page(context, url):
                     if create_time:
                         upload_date = datetime.fromtimestamp(int(create_time)).strftime("%Y-%m-%d")
 
-            if caption or author:
-                break
-
         except Exception:
             pass
 
-        await page.wait_for_timeout(2000)
-
     # --- Fallbacks if JSON parsing fails ---
-    if not caption:
-        try:
-            meta = await page.query_selector('meta[name="description"]')
-            if meta:
-                caption = await meta.get_attribute("content")
-        except:
-            pass
-
     if not hashtags and caption:
         hashtags = extract_hashtags_from_text(caption)
 
@@ -165,19 +177,25 @@ async def scrape_video_page(context, url):
     data["Comment_Count"] = normalize_count(comment_txt)
     data["Share_Count"] = normalize_count(share_txt)
     data["Hashtags"] = ",".join(sorted(set(hashtags)))
+    TIMING.record("extraction", time.perf_counter() - extraction_start, url=url)
 
-    await page.close()
+    with TIMING.stage("close", url=url):
+        await page.close()
     return data
 
 
-async def scrape_hashtag(context, tag, max_videos, seen_ids):
+async def scrape_hashtag(context, tag, max_videos, seen_ids, writer=None):
+    TIMING.bind(tag=tag)
     url = f"https://www.tiktok.com/tag/{tag}"
     page = await context.new_page()
-    await page.goto(url, timeout=60000)
+    with TIMING.stage("goto", url=url):
+        await page.goto(url, timeout=60000)
 
-    await accept_cookies_if_present(page)
-    await dismiss_open_app_popup(page)
-    await dismiss_interest_popup(page)
+    with TIMING.stage("popups", url=url):
+        await accept_cookies_if_present(page)
+        await dismiss_open_app_popup(page)
+        await dismiss_interest_popup(page)
+    scroll_start = time.perf_counter()
 
     collected = []
     video_links = set()
@@ -195,15 +213,19 @@ async def scrape_hashtag(context, tag, max_videos, seen_ids):
         if not links:
             break
 
+    TIMING.record("scroll", time.perf_counter() - scroll_start, url=url)
     print(f"{tag}: {len(video_links)} video links to scrape")
     for i, vurl in enumerate(list(video_links)[:max_videos], start=1):
         vid = vurl.split("/")[-1]
         if vid in seen_ids:
             continue
         print(f"  [{i}/{len(video_links)}] {vurl}")
+        TIMING.bind(url=vurl)
         details = await scrape_video_page(context, vurl)
         collected.append(details)
         seen_ids.add(vid)
+        if writer:
+            writer.write(details)
 
         # DEBUG: show first 10 results in terminal
         if i <= 10:
@@ -213,32 +235,40 @@ async def scrape_hashtag(context, tag, max_videos, seen_ids):
     return collected
 
 async def main():
-    existing = []
-    seen_ids = set()
-
-    if OUT_PATH.exists():
-        existing = pd.read_csv(OUT_PATH).to_dict("records")
-        seen_ids = set([r["TikTok_Video_ID"] for r in existing if "TikTok_Video_ID" in r])
-        print(f"[Init] Loaded {len(existing)} existing rows. De-dup seeded.")
+    # De-dup comes from the on-disk index; the CSV itself is never re-read
+    seen_ids = SeenIndex(OUT_PATH)
+    print(f"[Init] {seen_ids.row_count} existing rows. De-dup seeded.")
+    TIMING.open(OUT_PATH.with_name("run_timing.jsonl"))
+    writer = RowWriter(
+        OUT_PATH, COLUMNS, flush_every=WRITE_BATCH,
+        on_flush=lambda rows: seen_ids.record([r["TikTok_Video_ID"] for r in rows], []),
+    )
 
     async with async_playwright() as pw:
         browser = await pw.chromium.launch(headless=True)
         context = await browser.new_context()
+        route_policy = RoutePolicy(block_types=BLOCK_RESOURCE_TYPES)
+        await route_policy.install(context)
 
-        new_records = []
         for tag in HASHTAGS:
-            items = await scrape_hashtag(context, tag, MAX_VIDEOS_PER_TAG, seen_ids)
-            new_records.extend(items)
+            await scrape_hashtag(context, tag, MAX_VIDEOS_PER_TAG, seen_ids, writer)
 
         await browser.close()
 
-    if new_records:
-        all_data = existing + new_records
-        df = pd.DataFrame(all_data)
-        df.to_csv(OUT_PATH, index=False)
-        print(f"Progress saved (+{len(new_records)}). Total={len(df)}")
+    writer.close()
+
+    print(route_policy.summary())
+    print(READINESS.summary())
+    print(TIMING.summary())
+    TIMING.write_prometheus(OUT_PATH.with_name("run_timing.prom"))
+    TIMING.close()
+    CAPTIONS.dump(OUT_PATH.with_name("caption_strategies.json"))
+
+    if writer.written:
+        print(f"Progress saved (+{writer.written}). Total={seen_ids.row_count}")
     else:
         print("No new videos collected.")
+    seen_ids.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
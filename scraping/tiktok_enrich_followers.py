@@ -0,0 +1,130 @@
+# scraping/tiktok_enrich_followers.py
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+import pandas as pd
+from playwright.async_api import async_playwright
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.workers import run_pool
+from utils.paths import data_dir, dataset_dir
+from utils.pacing import RateController
+from utils.routing import RoutePolicy
+from utils.extract import extract_follower_count
+from utils.author_cache import AuthorCache, normalize_author
+from utils.helpers import normalize_count, human_pause
+from utils import parquet_store
+
+# ---------------- CONFIG ----------------
+PROFILE_CONCURRENCY = 3    # author profile pages open at once
+HOST_CONCURRENCY = 2       # politeness cap: in-flight requests per host
+HOST_MIN_INTERVAL = 1.0    # politeness cap: seconds between page starts per host
+FOLLOWERS_TTL_HOURS = 7 * 24   # re-fetch a cached follower count after this long
+PROFILE_TIMEOUT_MS = 8000  # stop waiting for the follower count after this long
+CHUNK_ROWS = 100_000       # rows per chunk when joining counts back
+BLOCK_RESOURCE_TYPES = ("media", "image", "font")  # aborted via page.route; () to load everything
+WRITE_PARQUET = True       # rebuild the analysis' Parquet dataset (final/tiktok_dataset) from the join
+# ---------------------------------------
+
+PACER = RateController(rate=0.5, concurrency=PROFILE_CONCURRENCY,
+                       max_concurrency=min(PROFILE_CONCURRENCY, HOST_CONCURRENCY),
+                       max_rate=1.0 / HOST_MIN_INTERVAL)
+
+
+async def fetch_followers(context, author):
+    page = await context.new_page()
+    try:
+        async with PACER.slot():
+            await page.goto(f"https://www.tiktok.com/@{author}", timeout=60000)
+            found = await extract_follower_count(page, author, timeout=PROFILE_TIMEOUT_MS)
+        blocked = bool(found and found.get("blocked"))
+        PACER.record(blocked=blocked, timeout=found is None)
+        if not found or blocked:
+            print(f"  @{author}: {'blocked' if blocked else 'no follower count'}")
+            return None
+        followers = normalize_count(found.get("followers"))
+        await human_pause(0.5, 1.5, scale=PACER.pause_scale)
+        return followers if isinstance(followers, int) else None
+    finally:
+        await page.close()
+
+
+def join_followers(in_path, out_path, followers):
+    """Stream `in_path` in chunks, fill Author_Followers from `followers`, swap `out_path` in."""
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=out_path.parent, prefix=out_path.name, suffix=".tmp")
+    os.close(fd)
+    filled = total = 0
+    try:
+        for i, chunk in enumerate(pd.read_csv(in_path, chunksize=CHUNK_ROWS)):
+            keys = chunk["Author"].map(normalize_author)
+            mapped = keys.map(followers)
+            if "Author_Followers" in chunk.columns:
+                # keep counts an earlier pass already filled in
+                mapped = mapped.fillna(pd.to_numeric(chunk["Author_Followers"], errors="coerce"))
+            chunk["Author_Followers"] = mapped.astype("Int64")
+            filled += int(mapped.notna().sum())
+            total += len(chunk)
+            chunk.to_csv(tmp, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        os.replace(tmp, out_path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    return filled, total
+
+
+async def main():
+    # the repaired copy (`kbeauty clean`) when there is one
+    in_path = data_dir() / "raw" / "tiktok_discovery_clean.csv"
+    if not in_path.exists():
+        in_path = in_path.with_name("tiktok_discovery.csv")
+    out_path = data_dir() / "raw" / "tiktok_with_followers.csv"
+    cache = AuthorCache(in_path.with_name("author_followers.sqlite"), ttl_hours=FOLLOWERS_TTL_HOURS)
+
+    # one profile visit per distinct author, and only when the cache has nothing fresh
+    authors = set()
+    for chunk in pd.read_csv(in_path, usecols=["Author"], chunksize=CHUNK_ROWS):
+        authors.update(chunk["Author"].dropna())
+    todo = cache.stale(authors)
+    print(f"[Followers] {len(authors)} distinct authors, {len(todo)} to fetch")
+
+    if todo:
+        async with async_playwright() as p:
+            context = await p.chromium.launch_persistent_context(
+                user_data_dir=str(Path.home() / "tiktok_profile"),
+                headless=False,
+                args=["--disable-blink-features=AutomationControlled"]
+            )
+            route_policy = RoutePolicy(block_types=BLOCK_RESOURCE_TYPES)
+            await route_policy.install(context)
+
+            async def _worker(i, author):
+                followers = await fetch_followers(context, author)
+                cache.put(author, followers)  # persisted as we go, so an interrupted run keeps its work
+                if followers is not None:
+                    print(f"  [{i + 1}/{len(todo)}] @{author}: {followers}")
+                return followers
+
+            results = await run_pool(
+                todo, _worker,
+                concurrency=PROFILE_CONCURRENCY,
+                per_host=HOST_CONCURRENCY,
+                host_interval=HOST_MIN_INTERVAL,
+                url_of=lambda a: f"https://www.tiktok.com/@{a}",
+            )
+            await context.close()
+        print(route_policy.summary())
+        print(PACER.summary())
+        print(f"[Followers] fetched {sum(r is not None for r in results)}/{len(todo)} profiles")
+
+    filled, total = join_followers(in_path, out_path, cache.followers())
+    print(f"[Followers] {filled}/{total} rows have Author_Followers -> {out_path}")
+    if WRITE_PARQUET:
+        # the model reads Author_Followers from the dataset, not from this CSV
+        parquet_store.convert_csv(out_path, dataset_dir())
+    cache.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
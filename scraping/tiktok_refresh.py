@@ -0,0 +1,92 @@
+# scraping/tiktok_refresh.py
+import asyncio
+import sys
+from pathlib import Path
+from playwright.async_api import async_playwright
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.workers import run_pool
+from utils.paths import data_dir
+from utils.routing import RoutePolicy
+from utils.snapshots import SnapshotStore, RefreshQueue, PageBudget
+from tiktok_discovery_main import (
+    scrape_video_page, human_pause, PACER, READINESS, CAPTIONS,
+    HOST_CONCURRENCY, HOST_MIN_INTERVAL, MAX_VIDEO_CONCURRENCY, BLOCK_RESOURCE_TYPES,
+)
+
+# ---------------- CONFIG ----------------
+PAGES_PER_HOUR = 120       # hard budget of video page loads in any sliding hour
+MAX_PAGES_PER_RUN = 200    # stop after this many re-visits
+MIN_REFRESH_AGE_HOURS = 6  # skip videos snapshotted more recently than this
+VELOCITY_WEIGHT = 1.0      # priority weight of log(engagement growth per hour)
+STALENESS_WEIGHT = 1.0     # priority weight of log(hours since last snapshot)
+# ---------------------------------------
+
+
+async def refresh_video(context, vid, url, store, budget):
+    await budget.acquire()
+    try:
+        async with PACER.slot():
+            row = await scrape_video_page(context, url)
+    except Exception as e:
+        if "Timeout" in type(e).__name__:
+            PACER.record(timeout=True)
+        raise
+    if not store.add(vid, url, row.get("Like_Count"), row.get("Comment_Count"), row.get("Share_Count")):
+        # no count at all (blocked or not rendered): a reading of 0 would fake growth next time
+        print(f"  [refresh] {vid}: no counts, no snapshot")
+        return None
+    print(f"  [refresh] {vid}: likes={row.get('Like_Count')} comments={row.get('Comment_Count')} "
+          f"shares={row.get('Share_Count')}")
+    await human_pause(0.8, 2.0)
+    return row
+
+
+async def main():
+    csv_path = data_dir() / "raw" / "tiktok_discovery.csv"
+    store = SnapshotStore(csv_path.with_name("tiktok_snapshots.sqlite"))
+
+    seeded = store.seed_from_csv(csv_path)
+    if seeded:
+        print(f"[Refresh] seeded {seeded} videos with their discovery-time counts")
+
+    queue = RefreshQueue(VELOCITY_WEIGHT, STALENESS_WEIGHT, MIN_REFRESH_AGE_HOURS)
+    queue.build(store.latest(), store.upload_times())
+    batch = queue.pop(MAX_PAGES_PER_RUN)
+    print(f"[Refresh] {len(batch)} videos due (of {len(batch) + len(queue)} eligible), "
+          f"budget {PAGES_PER_HOUR} pages/hour")
+    if not batch:
+        store.close()
+        return
+
+    async with async_playwright() as p:
+        context = await p.chromium.launch_persistent_context(
+            user_data_dir=str(Path.home() / "tiktok_profile"),
+            headless=False,
+            args=["--disable-blink-features=AutomationControlled"]
+        )
+        route_policy = RoutePolicy(block_types=BLOCK_RESOURCE_TYPES)
+        await route_policy.install(context)
+
+        budget = PageBudget(PAGES_PER_HOUR)
+        results = await run_pool(
+            batch,
+            lambda i, job: refresh_video(context, job[0], job[1], store, budget),
+            concurrency=MAX_VIDEO_CONCURRENCY,  # PACER.slot() gates how many actually run
+            per_host=HOST_CONCURRENCY,
+            host_interval=HOST_MIN_INTERVAL,
+            url_of=lambda job: job[1],
+        )
+        await context.close()
+
+    refreshed = sum(r is not None for r in results)
+    print(route_policy.summary())
+    print(READINESS.summary())
+    print(PACER.summary())
+    CAPTIONS.dump()
+    print(f"Run summary: {refreshed}/{len(batch)} videos refreshed, "
+          f"{store.count()} snapshots in {store.path}")
+    store.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
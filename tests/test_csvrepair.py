@@ -0,0 +1,39 @@
+# tests/test_csvrepair.py
+import csv
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.csvrepair import repair_csv
+from utils.writer import RowWriter
+
+COLUMNS = ["Video_ID", "TikTok_Video_ID", "Caption", "Like_Count"]
+CAPTIONS = ["¯\\_(ツ)_/¯", "C:\\new", "ends with \\", 'say "hi", \\"ok\\"', "plain, with comma"]
+
+
+def read(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return list(csv.reader(f))
+
+
+def test_round_trip_row_writer(tmp_path):
+    path = tmp_path / "raw.csv"
+    with RowWriter(path, COLUMNS, flush_every=2) as w:
+        for i, cap in enumerate(CAPTIONS):
+            w.write({"Video_ID": f"VID_{i:06d}", "TikTok_Video_ID": str(7500 + i),
+                     "Caption": cap, "Like_Count": i})
+    stats = repair_csv(path)
+    rows = read(path)
+    assert rows[0] == COLUMNS
+    assert [r[2] for r in rows[1:]] == CAPTIONS
+    assert stats["fixed"] == 0 and stats["escapes"] == 0
+
+
+def test_backslash_escaped_quotes(tmp_path):
+    path = tmp_path / "raw.csv"
+    path.write_text('"Video_ID","Caption","Like_Count"\n'
+                    '"VID_000001","say \\"hi, there\\" now","5"\n'
+                    '"VID_000002","fine","6"\n', encoding="utf-8")
+    stats = repair_csv(path)
+    assert read(path)[1:] == [["VID_000001", 'say "hi, there" now', "5"], ["VID_000002", "fine", "6"]]
+    assert stats["escapes"] == 1
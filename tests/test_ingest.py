@@ -0,0 +1,34 @@
+# tests/test_ingest.py
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils import parquet_store
+from utils.ingest import parse_counts
+
+
+def test_parse_counts_all_null():
+    assert parse_counts(pd.Series([None, None])).isna().all()
+    assert str(parse_counts(pd.Series([None, None])).dtype) == "Int32"
+    assert str(parse_counts(pd.Series(["3B", None])).dtype) == "Int64"
+
+
+def test_append_rows_scraper_rows(tmp_path):
+    # shaped like tiktok_discovery_main's rows: no Author_Followers, some counts missing
+    rows = [
+        {"Video_ID": "VID_000001", "TikTok_Video_ID": "7500000000000000001", "Hashtag_Seed": "kbeauty",
+         "Author": "a", "Caption": "glass skin", "Hashtags": "kbeauty", "Like_Count": "1.2K",
+         "Comment_Count": None, "Share_Count": None, "Upload_Date": "2025-06-01",
+         "URL": "https://www.tiktok.com/@a/video/7500000000000000001"},
+        {"Video_ID": "VID_000002", "TikTok_Video_ID": "7500000000000000002", "Hashtag_Seed": "kbeauty",
+         "Author": "b", "Caption": "[WARNING] Caption missing or blocked", "Hashtags": "",
+         "Like_Count": None, "Comment_Count": None, "Share_Count": None, "Upload_Date": "06-02",
+         "URL": "https://www.tiktok.com/@b/video/7500000000000000002"},
+    ]
+    assert parquet_store.append_rows(tmp_path, rows) == 2
+    df = parquet_store.load(tmp_path).sort_values("Video_ID")
+    assert df["Author_Followers"].isna().all()
+    assert df["Like_Count"].tolist()[0] == 1200
+    assert pd.isna(df["Like_Count"].tolist()[1])
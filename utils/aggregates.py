@@ -0,0 +1,232 @@
+# utils/aggregates.py
+import json
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils.idgen import id_seq
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch for non-negative values (DDSketch-style): a
+    value v > 0 is counted in log bucket ceil(log_gamma(v)), so every
+    quantile comes back within relative error `alpha`; zeros get their own
+    bucket. Memory grows with the value range's orders of magnitude, not
+    with the number of values.
+    """
+
+    def __init__(self, alpha=0.005):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.zeros = 0
+        self.bins = {}
+
+    @property
+    def count(self):
+        return self.zeros + sum(self.bins.values())
+
+    def add_many(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        positive = values[values > 0]
+        self.zeros += int(len(values) - len(positive))
+        idx, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                                return_counts=True)
+        for i, c in zip(idx.tolist(), counts.tolist()):
+            self.bins[i] = self.bins.get(i, 0) + c
+
+    def merge(self, other):
+        self.zeros += other.zeros
+        for i, c in other.bins.items():
+            self.bins[i] = self.bins.get(i, 0) + c
+
+    def _value_at(self, rank):
+        if rank < self.zeros:
+            return 0.0
+        seen = self.zeros
+        for i in sorted(self.bins):
+            seen += self.bins[i]
+            if rank < seen:
+                return 2 * self.gamma ** i / (self.gamma + 1)
+        return float("nan")
+
+    def quantile(self, q):
+        """Like pandas: interpolate between the two ranks around q * (n - 1)."""
+        n = self.count
+        if n == 0:
+            return float("nan")
+        rank = q * (n - 1)
+        lo, hi = math.floor(rank), math.ceil(rank)
+        a, b = self._value_at(lo), self._value_at(hi)
+        return a + (b - a) * (rank - lo)
+
+    def to_dict(self):
+        return {"zeros": self.zeros, "bins": {str(i): c for i, c in self.bins.items()}}
+
+    @classmethod
+    def from_dict(cls, d, alpha):
+        sketch = cls(alpha)
+        sketch.zeros = d["zeros"]
+        sketch.bins = {int(i): c for i, c in d["bins"].items()}
+        return sketch
+
+
+class Aggregates:
+    """
+    Mergeable per-group state: rows per group and, per metric, the non-null
+    count, sum and sum of squares (means and standard deviations follow
+    from those), plus a QuantileSketch for each metric in `sketch`. Group
+    keys are tuples of the `by` columns' values.
+    """
+
+    def __init__(self, by, metrics=(), sketch=(), alpha=0.005):
+        self.by = list(by)
+        self.metrics = list(metrics)
+        self.sketch = list(sketch)
+        self.alpha = alpha
+        self.groups = {}  # key -> {"rows": int, "n": [...], "sum": [...], "sumsq": [...]}
+        self.sketches = {}  # key -> {metric: QuantileSketch}
+
+    def _group(self, key):
+        g = self.groups.get(key)
+        if g is None:
+            k = len(self.metrics)
+            g = self.groups[key] = {"rows": 0, "n": [0] * k, "sum": [0.0] * k, "sumsq": [0.0] * k}
+        return g
+
+    def fold(self, keys, rows, n=None, sums=None, sumsq=None):
+        """Add per-group partials computed elsewhere (e.g. an indicator-matrix product)."""
+        for i, key in enumerate(keys):
+            if not rows[i]:
+                continue
+            g = self._group(tuple(key))
+            g["rows"] += int(rows[i])
+            for j in range(len(self.metrics)):
+                g["n"][j] += int(n[i][j])
+                g["sum"][j] += float(sums[i][j])
+                g["sumsq"][j] += float(sumsq[i][j])
+
+    def update(self, frame):
+        """Fold in the rows of `frame` (the `by` columns plus the metric columns)."""
+        frame = frame.dropna(subset=self.by)
+        if frame.empty:
+            return
+        values = frame[self.metrics].astype("float64")
+        parts = values.assign(_rows=1.0)
+        grouped = parts.groupby([frame[c] for c in self.by], sort=False)
+        counts = values.notna().groupby([frame[c] for c in self.by], sort=False).sum()
+        sums = grouped.sum()
+        sumsq = (values ** 2).groupby([frame[c] for c in self.by], sort=False).sum()
+        keys = [k if isinstance(k, tuple) else (k,) for k in sums.index]
+        self.fold(keys, sums["_rows"].to_numpy(), counts.to_numpy(),
+                  sums[self.metrics].to_numpy(), sumsq.to_numpy())
+        for m in self.sketch:
+            for key, vals in values[m].groupby([frame[c] for c in self.by], sort=False):
+                key = key if isinstance(key, tuple) else (key,)
+                sketches = self.sketches.setdefault(key, {})
+                sketches.setdefault(m, QuantileSketch(self.alpha)).add_many(vals.to_numpy())
+
+    def merge(self, other):
+        for key, g in other.groups.items():
+            self.fold([key], [g["rows"]], [g["n"]], [g["sum"]], [g["sumsq"]])
+        for key, sketches in other.sketches.items():
+            for m, s in sketches.items():
+                self.sketches.setdefault(key, {}).setdefault(m, QuantileSketch(self.alpha)).merge(s)
+
+    def frame(self):
+        """One row per group: the `by` columns, rows, and <metric>_{n,sum,mean,std[,median]}."""
+        records = []
+        for key, g in self.groups.items():
+            rec = dict(zip(self.by, key), rows=g["rows"])
+            for j, m in enumerate(self.metrics):
+                n, s, ss = g["n"][j], g["sum"][j], g["sumsq"][j]
+                rec[f"{m}_n"] = n
+                rec[f"{m}_sum"] = s
+                rec[f"{m}_mean"] = s / n if n else np.nan
+                rec[f"{m}_std"] = math.sqrt(max(ss - s * s / n, 0.0) / (n - 1)) if n > 1 else np.nan
+                if m in self.sketch:
+                    sketch = self.sketches.get(key, {}).get(m)
+                    rec[f"{m}_median"] = sketch.quantile(0.5) if sketch else np.nan
+            records.append(rec)
+        columns = self.by + ["rows"] + [f"{m}_{x}" for m in self.metrics for x in
+                                        ("n", "sum", "mean", "std") + (("median",) if m in self.sketch else ())]
+        return pd.DataFrame(records, columns=columns)
+
+    def to_dict(self):
+        return {
+            "groups": [[list(k), g] for k, g in self.groups.items()],
+            "sketches": [[list(k), {m: s.to_dict() for m, s in sk.items()}]
+                         for k, sk in self.sketches.items()],
+        }
+
+    def load_dict(self, d):
+        self.groups = {tuple(k): g for k, g in d["groups"]}
+        self.sketches = {tuple(k): {m: QuantileSketch.from_dict(s, self.alpha) for m, s in sk.items()}
+                         for k, sk in d["sketches"]}
+        return self
+
+
+class AggregateStore:
+    """
+    Named Aggregates persisted in one JSON file together with a Video_ID
+    watermark: the highest Video_ID sequence number already folded in. The
+    scrapers only append, with increasing Video_IDs, so each run folds in
+    just the rows above the watermark. Rows without a Video_ID are never
+    counted.
+
+    `key` identifies everything the state depends on besides the rows (alias
+    dictionaries, partition filters, ...); when it changes the stored state
+    is dropped and rebuilt from all rows. Rows rewritten in place (e.g. fixed
+    captions) are only picked up by a rebuild: delete the file or pass
+    rebuild=True.
+    """
+
+    def __init__(self, path, key, rebuild=False):
+        self.path = Path(path)
+        self.key = key
+        self.watermark = 0
+        self.meta = {}  # caller state saved together with the aggregates (e.g. output file sizes)
+        self._stored = {}
+        self.aggregates = {}
+        if self.path.exists() and not rebuild:
+            state = json.loads(self.path.read_text(encoding="utf-8"))
+            if state.get("key") == key:
+                self.watermark = state["watermark"]
+                self.meta = state.get("meta", {})
+                self._stored = state["aggregates"]
+            else:
+                print(f"[Aggregates] {self.path.name}: inputs changed, rebuilding from all rows")
+
+    def get(self, name, by, metrics=(), sketch=(), alpha=0.005):
+        if name not in self.aggregates:
+            agg = Aggregates(by, metrics, sketch, alpha)
+            if name in self._stored:
+                agg.load_dict(self._stored[name])
+            self.aggregates[name] = agg
+        return self.aggregates[name]
+
+    def new_rows(self, video_ids):
+        """Boolean mask of the rows not folded in yet."""
+        seqs = pd.Series(video_ids).map(id_seq).to_numpy()
+        return seqs > self.watermark
+
+    def advance(self, video_ids):
+        seqs = [id_seq(v) for v in video_ids]
+        self.watermark = max([self.watermark] + seqs)
+
+    def save(self):
+        state = {
+            "key": self.key,
+            "watermark": self.watermark,
+            "meta": self.meta,
+            "aggregates": {**self._stored, **{n: a.to_dict() for n, a in self.aggregates.items()}},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
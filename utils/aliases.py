@@ -0,0 +1,114 @@
+# utils/aliases.py
+from collections import deque
+
+try:
+    import ahocorasick  # optional: pyahocorasick, the same automaton in C
+except ImportError:
+    ahocorasick = None
+
+
+class AliasMatcher:
+    """
+    Aho–Corasick automaton over alias dictionaries ({label: [alias, ...]}),
+    built once and then run over each caption / hashtag string in a single
+    pass, however many aliases there are.
+
+    `find` returns every hit with its position. `first` keeps the scripts'
+    original first-match rule: the label listed first in the dictionary wins,
+    whatever order its aliases appear in the text. Aliases are lowercased;
+    callers pass text already normalized the same way they used to test with
+    `alias in text`. An alias listed under several labels (e.g. "serum")
+    reports all of them.
+    """
+
+    def __init__(self, aliases):
+        self.labels = list(aliases)
+        words = {}
+        for rank, label in enumerate(self.labels):
+            for alias in aliases[label]:
+                alias = alias.lower()
+                if alias:
+                    ranks = words.setdefault(alias, [])
+                    if rank not in ranks:
+                        ranks.append(rank)
+        self._words = words
+        if ahocorasick is not None:
+            self._auto = ahocorasick.Automaton()
+            for alias, ranks in words.items():
+                self._auto.add_word(alias, (alias, tuple(ranks)))
+            if words:
+                self._auto.make_automaton()
+        else:
+            self._build(words)
+
+    def _build(self, words):
+        # trie as parallel lists: transitions, failure link, (alias, ranks) outputs
+        self._goto, self._fail, self._out = [{}], [0], [[]]
+        for alias, ranks in words.items():
+            state = 0
+            for ch in alias:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((alias, tuple(ranks)))
+        # breadth-first failure links; each state also inherits its fallback's outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _iter(self, text):
+        """(end index, alias, ranks) for every alias occurrence in `text`."""
+        if not text:
+            return
+        if ahocorasick is not None:
+            if self._words:
+                for end, (alias, ranks) in self._auto.iter(text):
+                    yield end, alias, ranks
+            return
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for alias, ranks in out[state]:
+                yield i, alias, ranks
+
+    def find(self, text):
+        """Every hit in `text` as (start, end, label, alias), in text order; `end` is exclusive."""
+        hits = []
+        for end, alias, ranks in self._iter(text):
+            for rank in ranks:
+                hits.append((end + 1 - len(alias), end + 1, self.labels[rank], alias))
+        return hits
+
+    def ranks(self, *texts):
+        """Sorted positions (in `labels`) of the labels with an alias in any of `texts`."""
+        return sorted({r for text in texts for _, _, ranks in self._iter(text) for r in ranks})
+
+    def matches(self, *texts):
+        """Set of labels with at least one alias in any of `texts`."""
+        return {self.labels[r] for r in self.ranks(*texts)}
+
+    def first(self, *texts):
+        """The highest-priority label with an alias in any of `texts`, or None."""
+        best = None
+        for text in texts:
+            for _, _, ranks in self._iter(text):
+                if best is None or ranks[0] < best:
+                    best = ranks[0]
+                    if best == 0:
+                        return self.labels[0]
+        return None if best is None else self.labels[best]
@@ -0,0 +1,64 @@
+# utils/author_cache.py
+import sqlite3
+import time
+from pathlib import Path
+
+
+def normalize_author(author):
+    author = str(author or "").strip().lstrip("@")
+    return author or None
+
+
+class AuthorCache:
+    """
+    Persistent author -> follower count cache (SQLite) with a TTL.
+
+    Entries older than `ttl_hours` are treated as missing and re-fetched;
+    a failed fetch is stored as NULL with a shorter `retry_hours` so a
+    blocked profile is not retried on every run.
+    """
+
+    def __init__(self, path, ttl_hours=7 * 24, retry_hours=12):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl_hours * 3600
+        self.retry = retry_hours * 3600
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS authors "
+            "(author TEXT PRIMARY KEY, followers INTEGER, fetched_at REAL NOT NULL)"
+        )
+
+    def _fresh(self, followers, fetched_at, now):
+        age = now - fetched_at
+        return age < (self.ttl if followers is not None else self.retry)
+
+    def stale(self, authors):
+        """The authors (normalized, deduplicated) with no fresh entry."""
+        now = time.time()
+        wanted = {a for a in map(normalize_author, authors) if a}
+        fresh = set()
+        rows = self.conn.execute("SELECT author, followers, fetched_at FROM authors")
+        for author, followers, fetched_at in rows:
+            if author in wanted and self._fresh(followers, fetched_at, now):
+                fresh.add(author)
+        return sorted(wanted - fresh)
+
+    def put(self, author, followers):
+        self.put_many([(author, followers)])
+
+    def put_many(self, items):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO authors VALUES (?, ?, ?)",
+                [(normalize_author(a), f, now) for a, f in items if normalize_author(a)],
+            )
+
+    def followers(self):
+        """author -> follower count for every known author (expired entries included)."""
+        return {a: f for a, f in self.conn.execute(
+            "SELECT author, followers FROM authors WHERE followers IS NOT NULL")}
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,211 @@
+# utils/captions.py
+import json
+import time
+from pathlib import Path
+
+BLOCKED_MARKER = "Sign up for an account"
+
+_SIGI_ITEM_MODULE_JS = """
+(videoId) => {
+  const el = document.querySelector('script#SIGI_STATE');
+  if (!el) return null;
+  try {
+    const mod = JSON.parse(el.textContent).ItemModule || {};
+    const item = mod[videoId] || mod[Object.keys(mod)[0]];
+    return (item && item.desc) || null;
+  } catch (e) { return null; }
+}
+"""
+
+_SIGI_ITEM_LIST_JS = """
+() => {
+  const el = document.querySelector('script#SIGI_STATE');
+  if (!el) return null;
+  try {
+    const list = ((JSON.parse(el.textContent).ItemList || {}).video || {}).list || [];
+    return (typeof list[0] === 'object' && list[0].desc) || null;
+  } catch (e) { return null; }
+}
+"""
+
+_REHYDRATION_JS = """
+() => {
+  const el = document.querySelector('script#__UNIVERSAL_DATA_FOR_REHYDRATION__');
+  if (!el) return null;
+  try {
+    const detail = (JSON.parse(el.textContent).__DEFAULT_SCOPE__ || {})['webapp.video-detail'];
+    return (detail && detail.itemInfo && detail.itemInfo.itemStruct && detail.itemInfo.itemStruct.desc) || null;
+  } catch (e) { return null; }
+}
+"""
+
+_META_JS = """
+() => {
+  const m = document.querySelector('meta[name="description"]');
+  return (m && m.getAttribute('content')) || null;
+}
+"""
+
+_DOM_DESC_JS = """
+() => {
+  for (const sel of ['h1[data-e2e="browse-video-desc"]', 'div[data-e2e="browse-video-desc"]',
+                     'span[data-e2e="browse-video-desc"]', 'div[data-e2e="video-desc"]']) {
+    const el = document.querySelector(sel);
+    const t = el && (el.innerText || '').trim();
+    if (t) return t;
+  }
+  return null;
+}
+"""
+
+
+# Strategies given as JS source run back to back inside one page.evaluate
+# (see CaptionEngine._batch_js): one round trip per page, not one per strategy.
+_BATCH_JS = """
+(videoId) => {
+  const out = [];
+  for (const [name, fn] of [%s]) {
+    const t0 = performance.now();
+    let text = null;
+    try { text = fn(videoId); } catch (e) {}
+    out.push([name, text, performance.now() - t0]);
+    if (text && String(text).trim() && !String(text).includes(%s)) break;
+  }
+  return out;
+}
+"""
+
+
+async def _expand_desc(page, video_id):
+    btn = await page.query_selector('button[data-e2e="expand-desc"], button:has-text("More")')
+    if not btn:
+        return None
+    await btn.click()
+    await page.wait_for_timeout(300)
+    return await page.evaluate(_DOM_DESC_JS)
+
+
+# name -> (strategy, tier); a strategy is JS source (a function of videoId)
+# or `async fn(page, video_id)`. The tier is a quality gate, not a cost:
+# cost only reorders strategies within a tier, so a lower tier always runs
+# first however cheap a higher one is.
+# - tier 0 returns the caption itself (page state / DOM)
+# - tier 1 is the meta description: cheap and nearly always present, but
+#   TikTok's summary ("297.1K Likes, ... TikTok video from ..."), so it may
+#   only fill in when tier 0 misses; ranked by cost it would win every page
+# - tier 2 clicks "more" and waits, only when there is no meta description
+# (the same order as the scrapers' original SIGI -> meta -> expand chain)
+STRATEGIES = {
+    "sigi_item_module": (_SIGI_ITEM_MODULE_JS, 0),
+    "sigi_item_list": (_SIGI_ITEM_LIST_JS, 0),
+    "rehydration": (_REHYDRATION_JS, 0),
+    "dom_desc": (_DOM_DESC_JS, 0),
+    "meta_description": (_META_JS, 1),
+    "expand_desc": (_expand_desc, 2),
+}
+
+
+def register_strategy(name, fn, tier=0):
+    """
+    Add or replace a caption strategy: JS source `(videoId) => text or null`
+    (batched with its neighbours) or `await fn(page, video_id)` -> text or None.
+    """
+    STRATEGIES[name] = (fn, tier)
+
+
+class CaptionEngine:
+    """
+    Runs the caption strategies tier by tier (see STRATEGIES), cheapest-first
+    within a tier. Each one records calls, hits and latency; the order is
+    recomputed before every page from the expected cost of reaching a
+    caption (mean latency / smoothed hit rate), so within its tier the
+    cheapest strategy that actually works on the current site rises to the
+    front. Untried strategies come after the measured ones of their tier,
+    in registration order.
+
+    Consecutive JS strategies in that order are sent as a single
+    page.evaluate that stops at the first hit and reports each strategy's
+    in-page time, so a page normally costs one round trip.
+    """
+
+    def __init__(self, names=None):
+        self.names = list(names or STRATEGIES)
+        self.stats = {n: {"calls": 0, "hits": 0, "total_ms": 0.0} for n in self.names}
+
+    def _cost(self, name):
+        st = self.stats[name]
+        if not st["calls"]:
+            return float("inf")
+        hit_rate = (st["hits"] + 1) / (st["calls"] + 2)
+        # 1 ms floor: a round trip is never free, so a strategy that keeps
+        # failing fast still sinks below one that works
+        return max(st["total_ms"] / st["calls"], 1.0) / hit_rate
+
+    def order(self):
+        position = {n: i for i, n in enumerate(self.names)}
+        return sorted(self.names, key=lambda n: (STRATEGIES[n][1], self._cost(n), position[n]))
+
+    def _record(self, name, text, ms):
+        text = (text or "").strip() if isinstance(text, str) else ""
+        ok = bool(text) and BLOCKED_MARKER not in text
+        st = self.stats[name]
+        st["calls"] += 1
+        st["hits"] += ok
+        st["total_ms"] += ms
+        return text if ok else None
+
+    @staticmethod
+    def _batch_js(names):
+        fns = ", ".join(f"[{json.dumps(n)}, {STRATEGIES[n][0].strip()}]" for n in names)
+        return _BATCH_JS % (fns, json.dumps(BLOCKED_MARKER))
+
+    async def _run_batch(self, page, video_id, names):
+        start = time.perf_counter()
+        try:
+            results = await page.evaluate(self._batch_js(names), video_id) or []
+        except Exception:
+            # the page went away mid-call: every strategy in the batch missed
+            ms = (time.perf_counter() - start) * 1000 / len(names)
+            results = [[n, None, ms] for n in names]
+        for name, text, ms in results:
+            text = self._record(name, text, ms)
+            if text:
+                return text, name
+        return None, None
+
+    async def run(self, page, video_id, skip=()):
+        """Returns (caption, strategy name), or (None, None) if every strategy failed."""
+        names = [n for n in self.order() if n not in skip]
+        i = 0
+        while i < len(names):
+            if isinstance(STRATEGIES[names[i]][0], str):
+                j = i
+                while j < len(names) and isinstance(STRATEGIES[names[j]][0], str):
+                    j += 1
+                text, name = await self._run_batch(page, video_id, names[i:j])
+                i = j
+            else:
+                name = names[i]
+                start = time.perf_counter()
+                try:
+                    text = await STRATEGIES[name][0](page, video_id)
+                except Exception:
+                    text = None
+                text = self._record(name, text, (time.perf_counter() - start) * 1000)
+                i += 1
+            if text:
+                return text, name
+        return None, None
+
+    def dump(self, path=None):
+        """Print the per-strategy table (and write it as JSON if a path is given)."""
+        print("[Captions] strategy        calls  hit%   avg ms")
+        for name in self.order():
+            st = self.stats[name]
+            calls = st["calls"]
+            hit = 100 * st["hits"] / calls if calls else 0
+            avg = st["total_ms"] / calls if calls else 0
+            print(f"[Captions] {name:<18} {calls:>5} {hit:>5.0f} {avg:>8.1f}")
+        if path:
+            Path(path).write_text(json.dumps(self.stats, indent=2))
+        return self.stats
@@ -0,0 +1,162 @@
+# utils/csvrepair.py
+import csv
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+
+def _is_unnamed(name):
+    name = name.strip()
+    return not name or name.startswith("Unnamed")
+
+
+# how the old tiktok_discovery.py wrote its CSV: pandas to_csv(quoting=QUOTE_ALL, escapechar="\\");
+# RowWriter and the other writers use plain CSV, where a backslash is just a character
+ESCAPED_DIALECT = {"escapechar": "\\", "doublequote": True}
+
+
+class _Records:
+    """
+    Plain csv.reader over `f` that also keeps the raw text of the record it
+    just returned (`raw`), for rows that need a re-parse.
+    NULs, which stop the parser, are removed first.
+    """
+
+    def __init__(self, f):
+        self._consumed = []
+        self.raw = ""
+        self._reader = csv.reader(self._lines(f))
+
+    def _lines(self, f):
+        for line in f:
+            line = line.replace("\x00", "")
+            self._consumed.append(line)
+            yield line
+
+    def __iter__(self):
+        for row in self._reader:
+            self.raw = "".join(self._consumed)
+            self._consumed = []
+            yield row
+
+
+def _reparse(raw, width):
+    """
+    Fallback for a record that did not parse to `width` fields as plain CSV:
+    it may come from a writer that backslash-escaped its quotes. Try it in
+    ESCAPED_DIALECT, then with escaped quotes turned into doubled ones; None
+    if neither fits.
+    """
+    for text, dialect in ((raw, ESCAPED_DIALECT), (raw.replace('\\"', '""'), {})):
+        try:
+            rows = [r for r in csv.reader(io.StringIO(text), **dialect) if any(v.strip() for v in r)]
+        except csv.Error:
+            continue
+        if rows and all(len(r) == width for r in rows):
+            return rows
+    return None
+
+
+def repair_csv(src, dst=None, chunk_rows=50_000, min_fields=None, caption_col="Caption",
+               encoding="utf-8"):
+    """
+    Stream `src` through a repair pass and atomically replace `dst` (default:
+    `src` itself) with the result. Memory stays bounded by `chunk_rows`.
+
+    - "Unnamed" / blank header columns are dropped
+    - rows with too many fields: empty overflow is trimmed, otherwise the
+      overflow is folded back into `caption_col` (an unquoted comma split it)
+    - rows with too few fields are padded, unless they have fewer than
+      `min_fields` (default: half the header), which marks a fragment
+    - records are parsed as plain CSV, so backslashes are kept; one that
+      doesn't come out at the header's width is re-parsed with a backslash
+      escapechar, or with backslash-escaped quotes turned into doubled ones
+      (counted as "escapes"), before the rules above
+    - NULs are removed; blank rows and repeated header rows are dropped
+
+    `encoding` is the output encoding (e.g. "utf-8-sig" for Excel).
+
+    Returns {"rows", "fixed", "dropped", "escapes", "unnamed_columns"}.
+    """
+    src = Path(src)
+    dst = Path(dst) if dst else src
+    csv.field_size_limit(sys.maxsize)
+    stats = {"rows": 0, "fixed": 0, "dropped": 0, "escapes": 0, "unnamed_columns": []}
+
+    fd, tmp = tempfile.mkstemp(dir=dst.parent, prefix=dst.name, suffix=".tmp")
+    try:
+        with open(src, newline="", encoding="utf-8-sig", errors="replace") as fin, \
+                os.fdopen(fd, "w", newline="", encoding=encoding) as fout:
+            records = _Records(fin)
+            reader = iter(records)  # records.raw: text of the row just read
+            writer = csv.writer(fout, quoting=csv.QUOTE_ALL, lineterminator="\n")
+
+            header = next(reader, None)
+            if header is None:
+                raise ValueError(f"{src} is empty")
+            width = len(header)
+            keep = [i for i, name in enumerate(header) if not _is_unnamed(name)]
+            stats["unnamed_columns"] = [header[i] for i in range(width) if i not in keep]
+            names = [header[i].strip() for i in keep]
+            raw_header = [h.strip() for h in header]
+            cap = header.index(caption_col) if caption_col in header else None
+            min_fields = min_fields or max(1, width // 2)
+            writer.writerow(names)
+
+            def rows():
+                for row in reader:
+                    if len(row) != width and any(v.strip() for v in row):
+                        reparsed = _reparse(records.raw, width)
+                        if reparsed:
+                            stats["escapes"] += 1
+                            yield from reparsed
+                            continue
+                    yield row
+
+            chunk = []
+            for row in rows():
+                if not any(v.strip() for v in row) or [v.strip() for v in row] in (raw_header, names):
+                    stats["dropped"] += 1
+                    continue
+                fixed = False
+                if len(row) > width:
+                    extra = len(row) - width
+                    if not any(v.strip() for v in row[width:]):
+                        row = row[:width]
+                    elif cap is not None:
+                        row = row[:cap] + [",".join(row[cap:cap + extra + 1])] + row[cap + extra + 1:]
+                    else:
+                        stats["dropped"] += 1
+                        continue
+                    fixed = True
+                elif len(row) < width:
+                    if len(row) < min_fields:
+                        stats["dropped"] += 1
+                        continue
+                    row = row + [""] * (width - len(row))
+                    fixed = True
+                stats["fixed"] += fixed
+                stats["rows"] += 1
+                chunk.append([row[i] for i in keep])
+                if len(chunk) >= chunk_rows:
+                    writer.writerows(chunk)
+                    chunk = []
+            writer.writerows(chunk)
+            fout.flush()
+            os.fsync(fout.fileno())
+        os.replace(tmp, dst)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+    print(f"[Repair] {src} -> {dst}: {stats['rows']} rows kept, "
+          f"{stats['fixed']} fixed, {stats['dropped']} dropped, {stats['escapes']} re-parsed"
+          + (f", removed columns {stats['unnamed_columns']}" if stats["unnamed_columns"] else ""))
+    return stats
+
+
+if __name__ == "__main__":
+    # python utils/csvrepair.py <src.csv> [dst.csv]
+    repair_csv(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,148 @@
+# utils/extract.py
+
+# Runs every field lookup of scrape_video_page inside the browser in one
+# page.evaluate: embedded state JSON first (SIGI_STATE, then the rehydration
+# blob that replaced it), then the meta description, then the DOM selectors.
+# Returns the row columns; counts come back raw for normalize_count.
+# With caption=false the caption lookups are skipped (CaptionEngine owns them).
+EXTRACT_JS = """
+({videoId, caption}) => {
+  const BLOCKED = 'Sign up for an account';
+  const out = {Caption: null, Caption_Source: null, Author: null, Upload_Date: null,
+               Like_Count: null, Comment_Count: null, Share_Count: null, Hashtags: []};
+  const okCaption = (t) => t && !t.includes(BLOCKED);
+  const pad = (n) => String(n).padStart(2, '0');
+  const ymd = (d) => `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}`;
+  const readJson = (sel) => {
+    const el = document.querySelector(sel);
+    if (!el) return null;
+    try { return JSON.parse(el.textContent); } catch (e) { return null; }
+  };
+
+  // --- embedded state ---
+  let item = null;
+  const sigi = readJson('script#SIGI_STATE');
+  if (sigi) {
+    const mod = sigi.ItemModule || {};
+    item = mod[videoId] || mod[Object.keys(mod)[0]] || null;
+    if (!item) {
+      const list = ((sigi.ItemList || {}).video || {}).list || [];
+      item = typeof list[0] === 'object' ? list[0] : null;
+    }
+  }
+  if (!item) {
+    const rehy = readJson('script#__UNIVERSAL_DATA_FOR_REHYDRATION__');
+    const scope = rehy && rehy.__DEFAULT_SCOPE__;
+    const detail = scope && scope['webapp.video-detail'];
+    item = (detail && detail.itemInfo && detail.itemInfo.itemStruct) || null;
+  }
+  if (item) {
+    if (caption && okCaption(item.desc)) { out.Caption = item.desc; out.Caption_Source = 'state'; }
+    const a = item.author;
+    out.Author = (a && typeof a === 'object') ? (a.uniqueId || a.nickname || null) : (a || item.authorName || item.nickname || null);
+    if (item.createTime) out.Upload_Date = ymd(new Date(Number(item.createTime) * 1000));
+    const s = item.stats || {};
+    out.Like_Count = s.diggCount ?? null;
+    out.Comment_Count = s.commentCount ?? null;
+    out.Share_Count = s.shareCount ?? null;
+    out.Hashtags = (item.textExtra || []).map((t) => t.hashtagName).filter(Boolean);
+  }
+
+  // --- meta description ---
+  if (caption && !out.Caption) {
+    const m = document.querySelector('meta[name="description"]');
+    const c = m && m.getAttribute('content');
+    if (c) { out.Caption = c; out.Caption_Source = 'meta'; }
+  }
+
+  // --- DOM selectors ---
+  const text = (sels) => {
+    for (const sel of sels) {
+      const el = document.querySelector(sel);
+      const t = el && (el.innerText || '').trim();
+      if (t) return t;
+    }
+    return null;
+  };
+  if (caption && !out.Caption) {
+    const t = text(['h1[data-e2e="browse-video-desc"]', 'div[data-e2e="browse-video-desc"]',
+                    'span[data-e2e="browse-video-desc"]', 'div[data-e2e="video-desc"]']);
+    if (okCaption(t)) { out.Caption = t; out.Caption_Source = 'dom'; }
+  }
+  if (!out.Author) {
+    const t = text(['a[href^="/@"] span[data-e2e="browse-username"]', 'span[data-e2e="browse-username"]', 'a[href^="/@"]']);
+    out.Author = t;
+  }
+  if (out.Author) out.Author = out.Author.replace(/^@+/, '');
+  if (!out.Upload_Date) {
+    const t = document.querySelector('span time');
+    out.Upload_Date = (t && t.getAttribute('datetime')) || null;
+  }
+  if (!out.Upload_Date) {
+    const spans = document.querySelectorAll('span[data-e2e="browser-nickname"] span');
+    const last = spans.length ? (spans[spans.length - 1].innerText || '').trim() : '';
+    if (/^\\d{4}-\\d{1,2}-\\d{1,2}$/.test(last)) {
+      out.Upload_Date = last;
+    } else if (/^\\d{1,2}-\\d{1,2}$/.test(last)) {
+      const [m, d] = last.split('-').map(Number);
+      out.Upload_Date = `${new Date().getFullYear()}-${pad(m)}-${pad(d)}`;
+    }
+  }
+  if (out.Like_Count === null) out.Like_Count = text(['strong[data-e2e="like-count"]', 'button[data-e2e="like-icon"] strong']);
+  if (out.Comment_Count === null) out.Comment_Count = text(['strong[data-e2e="comment-count"]', 'button[data-e2e="comment-icon"] strong']);
+  if (out.Share_Count === null) out.Share_Count = text(['strong[data-e2e="share-count"]', 'button[data-e2e="share-icon"] strong']);
+  if (!out.Hashtags.length) {
+    document.querySelectorAll('a[href*="/tag/"]').forEach((a) => {
+      const t = (a.innerText || '').trim();
+      if (t.startsWith('#')) out.Hashtags.push(t.replace(/^#+/, ''));
+    });
+  }
+  out.Hashtags = out.Hashtags.map((h) => h.toLowerCase());
+  return out;
+}
+"""
+
+
+async def extract_video_fields(page, video_id, caption=True):
+    """All row fields for the open video page in a single round trip ({} on failure)."""
+    try:
+        return await page.evaluate(EXTRACT_JS, {"videoId": video_id, "caption": caption}) or {}
+    except Exception:
+        return {}
+
+
+# Follower count on an author's profile page: user-detail state first
+# (rehydration blob, then SIGI_STATE's UserModule), then the header counter.
+# Returns {followers: raw count} (a number, or "1.2M"-style text for
+# normalize_count), {blocked: true} on a captcha / login wall, or null while
+# the page is still loading (an object, so a count of 0 still resolves).
+PROFILE_JS = """
+(author) => {
+  if (document.querySelector('#captcha-verify-container, [class*="captcha-verify"], [data-e2e="login-modal"]')) return {blocked: true};
+  const readJson = (sel) => {
+    const el = document.querySelector(sel);
+    if (!el) return null;
+    try { return JSON.parse(el.textContent); } catch (e) { return null; }
+  };
+  const rehy = readJson('script#__UNIVERSAL_DATA_FOR_REHYDRATION__');
+  const detail = rehy && rehy.__DEFAULT_SCOPE__ && rehy.__DEFAULT_SCOPE__['webapp.user-detail'];
+  const stats = detail && detail.userInfo && detail.userInfo.stats;
+  if (stats && stats.followerCount != null) return {followers: stats.followerCount};
+  const sigi = readJson('script#SIGI_STATE');
+  const um = sigi && sigi.UserModule;
+  const s = um && um.stats && (um.stats[author] || um.stats[Object.keys(um.stats)[0]]);
+  if (s && s.followerCount != null) return {followers: s.followerCount};
+  const el = document.querySelector('strong[data-e2e="followers-count"]');
+  const t = el && (el.innerText || '').trim();
+  return t ? {followers: t} : null;
+}
+"""
+
+
+async def extract_follower_count(page, author, timeout=8000):
+    """{"followers": raw count} or {"blocked": True} for the open profile page; None on timeout."""
+    try:
+        handle = await page.wait_for_function(PROFILE_JS, arg=author, timeout=timeout, polling=100)
+        return await handle.json_value()
+    except Exception:
+        return None
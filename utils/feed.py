@@ -0,0 +1,128 @@
+# utils/feed.py
+import asyncio
+import json
+import re
+from datetime import datetime
+
+# XHR endpoints the tag page pulls its video items from while scrolling
+ITEM_LIST_MARKERS = (
+    "/api/challenge/item_list",
+    "/api/recommend/item_list",
+    "/api/post/item_list",
+    "/item_list/",
+)
+
+
+def item_to_row(item):
+    """
+    Map one item-list entry onto the discovery row schema (minus Video_ID
+    and Hashtag_Seed, which the caller assigns). Returns None when the item
+    has no id or no caption, so the video falls back to a page visit.
+    """
+    vid = str(item.get("id") or "")
+    caption = item.get("desc")
+    if not vid or not caption:
+        return None
+
+    author = item.get("author")
+    if isinstance(author, dict):
+        author = author.get("uniqueId") or author.get("nickname")
+    author = (author or "").lstrip("@") or None
+
+    hashtags = [
+        (t.get("hashtagName") or "").lower()
+        for t in (item.get("textExtra") or [])
+        if t.get("hashtagName")
+    ]
+    if not hashtags:
+        hashtags = [h.lower() for h in re.findall(r"#([A-Za-z0-9_]+)", caption)]
+
+    upload_date = None
+    create_time = item.get("createTime")
+    if create_time:
+        try:
+            upload_date = datetime.fromtimestamp(int(create_time)).strftime("%Y-%m-%d")
+        except (TypeError, ValueError, OSError):
+            pass
+
+    stats = item.get("stats") or item.get("statsV2") or {}
+
+    def _count(key):
+        val = stats.get(key)
+        try:
+            return int(val) if val is not None else None
+        except (TypeError, ValueError):
+            return None
+
+    url = f"https://www.tiktok.com/@{author}/video/{vid}" if author else None
+    return {
+        "URL": url,
+        "TikTok_Video_ID": vid,
+        "Caption": caption,
+        "Hashtags": ",".join(sorted(set(hashtags))),
+        "Author": author,
+        "Upload_Date": upload_date,
+        "Like_Count": _count("diggCount"),
+        "Comment_Count": _count("commentCount"),
+        "Share_Count": _count("shareCount"),
+    }
+
+
+class FeedCapture:
+    """
+    Listens to a tag page's network responses and keeps a row for every
+    video that shows up in an item-list payload. Attach before page.goto.
+    """
+
+    def __init__(self, page, markers=ITEM_LIST_MARKERS):
+        self.markers = markers
+        self.rows = {}
+        self.payloads = 0
+        self._pending = set()
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        if not any(m in response.url for m in self.markers):
+            return
+        task = asyncio.ensure_future(self._parse(response))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _parse(self, response):
+        try:
+            payload = json.loads(await response.text())
+        except Exception:
+            return
+        items = payload.get("itemList") or payload.get("items") or []
+        self.payloads += 1
+        for item in items:
+            row = item_to_row(item)
+            if row:
+                self.rows[row["TikTok_Video_ID"]] = row
+
+    async def drain(self):
+        # wait for response bodies that are still being parsed
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    async def lookup(self, vid, url=None, timeout=5.0):
+        """
+        row_for, but when the video isn't known yet, first wait (up to
+        `timeout` seconds) for the item-list responses still being parsed:
+        links are handed out while the tag page scrolls, often before the
+        payload that describes them has been read.
+        """
+        row = self.row_for(vid, url=url)
+        if row is None and self._pending:
+            await asyncio.wait(list(self._pending), timeout=timeout)
+            row = self.row_for(vid, url=url)
+        return row
+
+    def row_for(self, vid, url=None):
+        row = self.rows.get(vid)
+        if row is None:
+            return None
+        row = dict(row)
+        if url:
+            row["URL"] = url
+        return row
@@ -0,0 +1,41 @@
+# utils/harvest.py
+
+# Installs (once per document) a MutationObserver that records every video
+# anchor added to the feed, then returns only the hrefs seen since the last
+# call. One round trip per scroll, and its cost does not grow with the feed.
+HARVEST_JS = """
+() => {
+  if (!window.__kbHarvest) {
+    const seen = new Set();
+    const fresh = [];
+    const take = (a) => {
+      const href = a.getAttribute && a.getAttribute('href');
+      if (!href || !href.includes('/video/')) return;
+      const url = href.split('?')[0];
+      if (!seen.has(url)) { seen.add(url); fresh.push(url); }
+    };
+    const scan = (node) => {
+      if (node.nodeType !== 1) return;
+      if (node.matches('a[href*="/video/"]')) take(node);
+      node.querySelectorAll('a[href*="/video/"]').forEach(take);
+    };
+    scan(document.body);
+    new MutationObserver((mutations) => {
+      for (const m of mutations) {
+        if (m.type === 'attributes') { if (m.target.nodeType === 1 && m.target.matches('a')) take(m.target); continue; }
+        m.addedNodes.forEach(scan);
+      }
+    }).observe(document.body, {childList: true, subtree: true, attributes: true, attributeFilter: ['href']});
+    window.__kbHarvest = {drain: () => fresh.splice(0, fresh.length), total: () => seen.size};
+  }
+  return window.__kbHarvest.drain();
+}
+"""
+
+
+async def harvest_new_links(page):
+    """Video hrefs (query string stripped) that appeared since the last call."""
+    try:
+        return await page.evaluate(HARVEST_JS)
+    except Exception:
+        return []
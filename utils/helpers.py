@@ -0,0 +1,34 @@
+# utils/helpers.py
+# Small helpers shared by the scraper scripts.
+import asyncio
+import random
+import re
+
+
+def extract_hashtags_from_text(text: str):
+    return [h.lower() for h in re.findall(r"#([A-Za-z0-9_]+)", text or "")]
+
+
+def normalize_count(val):
+    if val is None:
+        return None
+    s = str(val).strip().upper().replace(",", "")
+    try:
+        if s.endswith("K"):
+            return int(float(s[:-1]) * 1_000)
+        if s.endswith("M"):
+            return int(float(s[:-1]) * 1_000_000)
+        if s.endswith("B"):
+            return int(float(s[:-1]) * 1_000_000_000)
+        return int(s)
+    except:
+        return val
+
+
+def video_id_from_url(url):
+    return url.split("/")[-1].split("?")[0]
+
+
+async def human_pause(min_s, max_s, scale=1.0):
+    """Random sleep in [min_s, max_s] seconds, times `scale` (e.g. a RateController's pause_scale)."""
+    await asyncio.sleep(random.uniform(min_s, max_s) * scale)
@@ -0,0 +1,142 @@
+# utils/httpfetch.py
+import re
+import time
+from collections import Counter
+
+import httpx
+
+from utils.feed import item_to_row
+
+try:
+    import orjson  # optional: several times faster on the multi-MB state blobs
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+_STATE_RE = {
+    "rehydration": re.compile(
+        r'<script[^>]*id="__UNIVERSAL_DATA_FOR_REHYDRATION__"[^>]*>(.*?)</script>', re.S),
+    "sigi": re.compile(r'<script[^>]*id="SIGI_STATE"[^>]*>(.*?)</script>', re.S),
+}
+_WALL_MARKERS = ("captcha-verify", "verify-bar-close", "loginContainer")
+_BLOCK_OUTCOMES = ("walled", "http_403", "http_429")
+
+DEFAULT_HEADERS = {
+    "User-Agent": ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                   "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36"),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+def item_from_html(html, video_id):
+    """The video's item dict from the embedded state of a video page's HTML, or None."""
+    m = _STATE_RE["rehydration"].search(html)
+    if m:
+        try:
+            scope = _loads(m.group(1)).get("__DEFAULT_SCOPE__") or {}
+            detail = scope.get("webapp.video-detail") or {}
+            item = (detail.get("itemInfo") or {}).get("itemStruct")
+            if item:
+                return item
+        except Exception:
+            pass
+    m = _STATE_RE["sigi"].search(html)
+    if m:
+        try:
+            state = _loads(m.group(1))
+            mod = state.get("ItemModule") or {}
+            item = mod.get(video_id) or next(iter(mod.values()), None)
+            if item:
+                return item
+        except Exception:
+            pass
+    return None
+
+
+class HttpFetcher:
+    """
+    Browserless fast path for video pages: a pooled async HTTP client (keep-
+    alive connections, bounded per host) fetches the HTML and the row is
+    built from the embedded state JSON via item_to_row. `fetch_row` returns
+    None whenever that is not enough (non-200, walled page, no state, no
+    caption), and the caller falls back to the Playwright path; the reason
+    is counted for `summary()`.
+
+    `rewrite(url)` maps a TikTok URL to the one actually requested, e.g.
+    ReplayServer.url_for to run against the local stand-in.
+
+    With a `pacer` (RateController) every request takes a `pacer.slot()`
+    and reports blocked / timeout / time-to-data like a page visit, so the
+    fast path counts towards the rate and drives backoff.
+    """
+
+    def __init__(self, max_connections=10, cookies=None, headers=None, timeout=15.0, rewrite=None,
+                 pacer=None):
+        self.client = httpx.AsyncClient(
+            headers={**DEFAULT_HEADERS, **(headers or {})},
+            cookies=cookies,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+        )
+        self.rewrite = rewrite
+        self.pacer = pacer
+        self.outcomes = Counter()
+
+    @classmethod
+    async def from_context(cls, context, **kwargs):
+        """Reuse a Playwright context's cookies, so logged-in state carries over."""
+        cookies = httpx.Cookies()
+        for c in await context.cookies("https://www.tiktok.com"):
+            cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+        return cls(cookies=cookies, **kwargs)
+
+    async def fetch_row(self, url, video_id):
+        if self.pacer is None:
+            outcome, row = await self._fetch(url, video_id)
+        else:
+            async with self.pacer.slot():
+                start = time.monotonic()
+                outcome, row = await self._fetch(url, video_id)
+            self.pacer.record(blocked=outcome in _BLOCK_OUTCOMES, timeout=outcome == "timeout",
+                              ttd_ms=int((time.monotonic() - start) * 1000))
+        self.outcomes[outcome] += 1
+        return row
+
+    async def _fetch(self, url, video_id):
+        """(outcome, row or None) for one video page."""
+        try:
+            resp = await self.client.get(self.rewrite(url) if self.rewrite else url)
+        except httpx.TimeoutException:
+            return "timeout", None
+        except httpx.HTTPError:
+            return "error", None
+        if resp.status_code != 200:
+            return f"http_{resp.status_code}", None
+        html = resp.text
+        item = item_from_html(html, video_id)
+        if item is None:
+            wall = any(m in html for m in _WALL_MARKERS)
+            return ("walled" if wall else "no_state"), None
+        row = item_to_row(item)
+        if row is None:
+            return "no_caption", None
+        row["URL"] = url
+        return "fast", row
+
+    @property
+    def fallback_rate(self):
+        total = sum(self.outcomes.values())
+        return (total - self.outcomes["fast"]) / total if total else 0.0
+
+    def summary(self):
+        total = sum(self.outcomes.values())
+        reasons = ", ".join(f"{k}={v}" for k, v in self.outcomes.most_common() if k != "fast") or "none"
+        return (f"[HTTP] {self.outcomes['fast']}/{total} video pages without a browser, "
+                f"fallback rate {self.fallback_rate:.0%} ({reasons})")
+
+    async def close(self):
+        await self.client.aclose()
@@ -1,3 +1,12 @@
 # utils/idgen.py
+import re
+
+
 def make_id(n: int, prefix="TT") -> str:
     return f"{prefix}{n:04d}"
+
+
+def id_seq(video_id) -> int:
+    """Sequence number of a Video_ID made by make_id ("TT0042" -> 42); 0 if there is none."""
+    m = re.search(r"(\d+)$", str(video_id or ""))
+    return int(m.group(1)) if m else 0
@@ -0,0 +1,72 @@
+# utils/ingest.py
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+COUNT_COLUMNS = ["Like_Count", "Comment_Count", "Share_Count", "Author_Followers"]
+CATEGORY_COLUMNS = ["Hashtag_Seed", "Author"]
+
+_SUFFIX = {"": 1, "K": 1_000, "M": 1_000_000, "B": 1_000_000_000}
+_INT32_MAX = np.iinfo(np.int32).max
+
+
+def parse_counts(s):
+    """
+    Whole-column version of the scrapers' normalize_count: "297.1K", "1,234",
+    "2M", 538 -> nullable Int32 (Int64 when a value needs it). Anything that
+    doesn't parse becomes <NA> instead of leaving a string in the column.
+    """
+    if pd.api.types.is_integer_dtype(s) or pd.api.types.is_float_dtype(s):
+        values = pd.to_numeric(s, errors="coerce")
+    else:
+        parts = (s.astype("string").str.strip().str.upper().str.replace(",", "", regex=False)
+                 .str.extract(r"^(\d*\.?\d+)\s*([KMB]?)$"))
+        values = pd.to_numeric(parts[0], errors="coerce") * parts[1].map(_SUFFIX).astype("float64")
+    values = values.round()
+    big = values.notna().any() and values.max(skipna=True) > _INT32_MAX
+    return values.astype("Int64" if big else "Int32")
+
+
+def parse_dates(s, year=None):
+    """
+    Upload dates in any of the formats the scrapers have written -> datetime64:
+    ISO dates / timestamps, dd/mm/yyyy, and "MM-DD" (no year on the page;
+    `year` defaults to the current one, like the scrapers assume).
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    text = s.astype("string").str.strip()
+    out = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+
+    iso = text.str.match(r"^\d{4}-\d{1,2}-\d{1,2}", na=False)
+    dmy = text.str.match(r"^\d{1,2}/\d{1,2}/\d{4}$", na=False)
+    md = text.str.match(r"^\d{1,2}-\d{1,2}$", na=False)
+    if iso.any():
+        parsed = pd.to_datetime(text[iso], errors="coerce", format="ISO8601", utc=True)
+        out[iso] = parsed.dt.tz_localize(None)
+    if dmy.any():
+        out[dmy] = pd.to_datetime(text[dmy], errors="coerce", format="%d/%m/%Y")
+    if md.any():
+        year = year or date.today().year
+        out[md] = pd.to_datetime(f"{year}-" + text[md], errors="coerce", format="%Y-%m-%d")
+    return out
+
+
+def normalize(df):
+    """Typed, compact columns for whatever of the dataset's columns `df` has."""
+    for c in COUNT_COLUMNS:
+        if c in df.columns:
+            df[c] = parse_counts(df[c])
+    if "Upload_Date" in df.columns:
+        df["Upload_Date"] = parse_dates(df["Upload_Date"])
+    for c in CATEGORY_COLUMNS:
+        if c in df.columns:
+            df[c] = df[c].astype("category")
+    return df
+
+
+def load(root, columns=None, filters=None, csv_path=None):
+    """parquet_store.load (Parquet dataset, or the CSV fallback) with typed columns."""
+    from utils import parquet_store
+    return normalize(parquet_store.load(root, columns=columns, filters=filters, csv_path=csv_path))
@@ -0,0 +1,89 @@
+# utils/journal.py
+import json
+import os
+from pathlib import Path
+
+PENDING, DONE, FAILED, BLOCKED = "pending", "done", "failed", "blocked"
+
+
+class ScrapeJournal:
+    """
+    Write-ahead journal for a scrape run (JSON lines, fsynced per entry).
+
+    Records which tags have been harvested (with their URL list) and the
+    status of every URL, including the scraped row once it is done. A
+    restarted run replays it to skip re-scrolling harvested tags and
+    re-visiting finished videos. `commit()` clears it once the rows have
+    made it into the output CSV.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.tags = {}      # tag -> [urls] in harvest order
+        self.status = {}    # url -> status
+        self.rows = {}      # url -> row dict, for DONE / BLOCKED urls
+        self._replay()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "a", encoding="utf-8")
+        if self._f.tell() > 0:
+            self._f.write("\n")  # never append onto a torn last line
+
+    def _replay(self):
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ev = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                self._apply(ev)
+        if self.tags:
+            done = sum(1 for s in self.status.values() if s == DONE)
+            print(f"[Journal] Resuming: {len(self.tags)} tags harvested, "
+                  f"{done}/{len(self.status)} videos done")
+
+    def _apply(self, ev):
+        if ev.get("ev") == "harvested":
+            self.tags[ev["tag"]] = ev["urls"]
+            for u in ev["urls"]:
+                self.status.setdefault(u, PENDING)
+        elif ev.get("ev") == "status":
+            self.status[ev["url"]] = ev["status"]
+            if ev.get("row") is not None:
+                self.rows[ev["url"]] = ev["row"]
+
+    def _write(self, ev):
+        self._apply(ev)
+        self._f.write(json.dumps(ev, ensure_ascii=False, default=str) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    # --- run side ---
+    def harvested(self, tag):
+        return tag in self.tags
+
+    def record_harvest(self, tag, urls):
+        self._write({"ev": "harvested", "tag": tag, "urls": list(urls)})
+
+    def mark(self, url, status, row=None):
+        self._write({"ev": "status", "url": url, "status": status, "row": row})
+
+    def urls(self, tag):
+        return self.tags.get(tag, [])
+
+    def is_done(self, url):
+        return self.status.get(url) == DONE
+
+    def row(self, url):
+        return self.rows.get(url)
+
+    def commit(self):
+        """Output has been persisted: start the next run from a clean journal."""
+        self._f.close()
+        self.path.unlink(missing_ok=True)
+        self.tags, self.status, self.rows = {}, {}, {}
+        self._f = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        self._f.close()
@@ -0,0 +1,107 @@
+# utils/membership.py
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from utils.aliases import AliasMatcher
+
+
+def alias_key(aliases):
+    """Short hash of an alias dictionary; label order is part of it (it is the match priority)."""
+    blob = json.dumps([[label, list(a)] for label, a in aliases.items()], ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def row_keys(df, columns):
+    """64-bit content hash of each row's text columns."""
+    return pd.util.hash_pandas_object(df[columns].fillna("").astype(str), index=False).to_numpy()
+
+
+def _match_rows(matcher, texts):
+    indptr, indices = [0], []
+    for row in texts:
+        indices.extend(matcher.ranks(*row))
+        indptr.append(len(indices))
+    return indptr, indices
+
+
+def membership(df, columns, aliases, cache_dir, name):
+    """
+    Sparse boolean videos × labels matrix, aligned with `df`'s rows: entry
+    (i, j) is set when any alias of label j occurs in one of row i's
+    `columns`. Columns follow `aliases`' order, so the lowest set column of
+    a row is the scripts' first-match label (see `first_match`).
+
+    Cached in `cache_dir/<name>-<alias hash>.npz`, one matrix row per
+    distinct text content hash: a changed alias dictionary gets a fresh
+    cache, and on later runs only rows whose text is new are scanned.
+    """
+    cache_dir = Path(cache_dir)
+    path = cache_dir / f"{name}-{alias_key(aliases)}.npz"
+    keys = row_keys(df, columns)
+
+    cached_keys = np.empty(0, dtype=np.uint64)
+    cached = sparse.csr_matrix((0, len(aliases)), dtype=bool)
+    if path.exists():
+        with np.load(path) as z:
+            cached_keys = z["keys"]
+            cached = sparse.csr_matrix(
+                (np.ones(len(z["indices"]), dtype=bool), z["indices"], z["indptr"]),
+                shape=(len(cached_keys), len(aliases)),
+            )
+
+    new_keys, first_row = np.unique(keys[~np.isin(keys, cached_keys)], return_index=True)
+    if len(new_keys):
+        rows = df.loc[~np.isin(keys, cached_keys), columns].fillna("").to_numpy()[first_row]
+        indptr, indices = _match_rows(AliasMatcher(aliases), rows)
+        new = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=bool), np.asarray(indices, dtype=np.int32), indptr),
+            shape=(len(new_keys), len(aliases)),
+        )
+        all_keys = np.concatenate([cached_keys, new_keys])
+        order = np.argsort(all_keys, kind="stable")
+        cached_keys, cached = all_keys[order], sparse.vstack([cached, new], format="csr")[order]
+        cached.sort_indices()
+        _save(path, name, cached_keys, cached)
+    print(f"[Membership] {name}: {len(df)} rows, {len(new_keys)} new texts scanned, "
+          f"{len(cached_keys)} cached")
+
+    matrix = cached[np.searchsorted(cached_keys, keys)]
+    matrix.sort_indices()
+    return matrix
+
+
+def _save(path, name, keys, matrix):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        np.savez_compressed(f, keys=keys, indptr=matrix.indptr, indices=matrix.indices)
+    os.replace(tmp, path)
+    # caches for earlier versions of the same alias dictionary are dead weight
+    for old in path.parent.glob(f"{name}-{'?' * 16}.npz"):
+        if old != path:
+            old.unlink()
+
+
+def first_match(matrix):
+    """Per row, the lowest set column (the first-listed matching label), or -1."""
+    matrix = matrix.tocsr()
+    matrix.sort_indices()
+    nonempty = np.diff(matrix.indptr) > 0
+    first = np.full(matrix.shape[0], -1, dtype=np.int64)
+    first[nonempty] = matrix.indices[matrix.indptr[:-1][nonempty]]
+    return first
+
+
+def one_hot(index, n_labels):
+    """Sparse rows × n_labels indicator of `index` (-1 = no label), e.g. for first_match."""
+    index = np.asarray(index)
+    rows = np.flatnonzero(index >= 0)
+    return sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, index[rows])), shape=(len(index), n_labels)
+    )
@@ -0,0 +1,127 @@
+# utils/pacing.py
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class RateController:
+    """
+    AIMD pacing driven by block signals.
+
+    Every finished page reports whether it was blocked (caption warning,
+    captcha, login wall), timed out, and how long its data took to show up.
+    Healthy pages raise the request rate additively; a block, a timeout or
+    a warning rate above `max_warn_rate` over the last `window` pages cuts
+    rate and worker concurrency multiplicatively (at most once per
+    `cooldown` seconds, so one burst of bad pages counts once).
+
+    `slot()` gates page starts on the current rate and concurrency, and
+    `pause_scale` stretches or shrinks the human-like pauses to match.
+    `max_rate` / `max_concurrency` are hard ceilings (e.g. per-host
+    politeness caps): the controller probes up to them, never past.
+    """
+
+    def __init__(self, rate=0.5, min_rate=0.05, max_rate=2.0,
+                 increase=0.05, decrease=0.5,
+                 concurrency=3, min_concurrency=1, max_concurrency=6,
+                 slow_ms=8000, window=20, max_warn_rate=0.2, cooldown=30.0):
+        self.min_rate, self.max_rate = min_rate, max_rate
+        self.base_rate = min(max(rate, min_rate), max_rate)
+        self.rate = self.base_rate
+        self.increase, self.decrease = increase, decrease
+        self.min_concurrency, self.max_concurrency = min_concurrency, max_concurrency
+        self.concurrency = max(min_concurrency, min(max_concurrency, concurrency))
+        self.slow_ms = slow_ms
+        self.max_warn_rate = max_warn_rate
+        self.cooldown = cooldown
+        self.recent = deque(maxlen=window)
+        self.pages = 0
+        self.backoffs = 0
+        self._in_flight = 0
+        self._next_start = 0.0
+        self._last_backoff = 0.0
+        self._healthy_streak = 0
+        self._cond = asyncio.Condition()
+
+    @property
+    def warn_rate(self):
+        return sum(self.recent) / len(self.recent) if self.recent else 0.0
+
+    @property
+    def pause_scale(self):
+        # slower than the starting rate -> longer pauses, and vice versa
+        return self.base_rate / self.rate
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.concurrency)
+            self._in_flight += 1
+            wait = self._next_start - time.monotonic()
+            self._next_start = max(self._next_start, time.monotonic()) + 1.0 / self.rate
+        try:
+            if wait > 0:
+                await asyncio.sleep(wait)
+            yield
+        finally:
+            async with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def record(self, blocked=False, timeout=False, ttd_ms=None):
+        self.pages += 1
+        self.recent.append(1 if blocked else 0)
+        bad = blocked or timeout or self.warn_rate > self.max_warn_rate
+        if bad:
+            self._backoff(blocked, timeout)
+        elif ttd_ms is None or ttd_ms < self.slow_ms:
+            self._healthy_streak += 1
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            # one more worker after a full window of healthy pages
+            if self._healthy_streak >= (self.recent.maxlen or 20):
+                self._healthy_streak = 0
+                self._set_concurrency(self.concurrency + 1)
+
+    def _backoff(self, blocked, timeout):
+        self._healthy_streak = 0
+        now = time.monotonic()
+        if now - self._last_backoff < self.cooldown:
+            return
+        self._last_backoff = now
+        self.backoffs += 1
+        old_rate, old_conc = self.rate, self.concurrency
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self._set_concurrency(max(self.min_concurrency, int(self.concurrency * self.decrease)))
+        reason = "block" if blocked else "timeout" if timeout else f"warning rate {self.warn_rate:.0%}"
+        print(f"[Pacer] {reason}: rate {old_rate:.2f} -> {self.rate:.2f} req/s, "
+              f"concurrency {old_conc} -> {self.concurrency}")
+
+    def _set_concurrency(self, n):
+        old = self.concurrency
+        self.concurrency = max(self.min_concurrency, min(self.max_concurrency, n))
+        if self.concurrency > old:
+            # waiters in slot() would otherwise only wake when a slot is released
+            try:
+                asyncio.get_running_loop().create_task(self._wake())
+            except RuntimeError:
+                pass
+
+    async def _wake(self):
+        async with self._cond:
+            self._cond.notify_all()
+
+    def metrics(self):
+        return {
+            "rate": round(self.rate, 3),
+            "concurrency": self.concurrency,
+            "warn_rate": round(self.warn_rate, 3),
+            "pages": self.pages,
+            "backoffs": self.backoffs,
+        }
+
+    def summary(self):
+        m = self.metrics()
+        return (f"[Pacer] rate={m['rate']} req/s, concurrency={m['concurrency']}, "
+                f"warning rate={m['warn_rate']:.0%} over last {len(self.recent)} pages, "
+                f"{m['backoffs']} backoffs")
@@ -0,0 +1,167 @@
+# utils/pagepool.py
+import asyncio
+from contextlib import asynccontextmanager
+
+# JS heap of the page's renderer in bytes (Chromium only; None elsewhere)
+HEAP_JS = "() => (performance.memory && performance.memory.usedJSHeapSize) || null"
+
+
+class PagePool:
+    """
+    A fixed set of pages reused across navigations instead of a fresh
+    `context.new_page()` per video.
+
+    A page is replaced after `max_navigations` uses or once its JS heap
+    passes `page_memory_mb`. The whole context is restarted after
+    `context_max_navigations` uses or once the pages' heaps add up to more
+    than `context_memory_mb`: the pool waits for leased pages to come back,
+    saves the context's storage state (cookies, local storage), closes it,
+    and opens a new one through `context_factory(storage_state)`, re-adding
+    the cookies so a logged-in session carries over.
+
+    `init_script` is added once when a page is created, not per navigation.
+    """
+
+    def __init__(self, context_factory, size=3, init_script=None,
+                 max_navigations=50, page_memory_mb=400,
+                 context_max_navigations=600, context_memory_mb=1500, check_every=5):
+        self.context_factory = context_factory
+        self.size = size
+        self.init_script = init_script
+        self.max_navigations = max_navigations
+        self.page_memory = page_memory_mb * 1_000_000
+        self.context_max_navigations = context_max_navigations
+        self.context_memory = context_memory_mb * 1_000_000
+        self.check_every = check_every
+        self.context = None
+        self._idle = []          # [page, navigations, heap bytes]
+        self._leased = 0
+        self._context_navigations = 0
+        self._heaps = {}
+        self._restarting = False
+        self._cond = asyncio.Condition()
+        self.page_restarts = 0
+        self.context_restarts = 0
+        self.navigations = 0
+
+    async def start(self, storage_state=None):
+        """Open the first context (seeded with `storage_state`, e.g. another context's cookies)."""
+        self.context = await self.context_factory(storage_state)
+        return self
+
+    async def _new_page(self):
+        page = await self.context.new_page()
+        if self.init_script:
+            try:
+                await page.add_init_script(self.init_script)
+            except Exception:
+                pass
+        return [page, 0, 0]
+
+    async def _heap(self, page):
+        try:
+            return await page.evaluate(HEAP_JS) or 0
+        except Exception:
+            return 0
+
+    @asynccontextmanager
+    async def lease(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: not self._restarting and self._leased < self.size)
+            self._leased += 1
+            slot = self._idle.pop() if self._idle else None
+        try:
+            if slot is None:
+                slot = await self._new_page()
+            yield slot[0]
+        except BaseException:
+            # the page may be mid-navigation or crashed: don't hand it out again
+            await self._discard(slot)
+            slot = None
+            raise
+        finally:
+            if slot is not None:
+                await self._recycle(slot)
+            async with self._cond:
+                self._leased -= 1
+                self._cond.notify_all()
+            await self._maybe_restart_context()
+
+    async def _discard(self, slot):
+        if slot is None:
+            return
+        self._heaps.pop(id(slot[0]), None)
+        try:
+            await slot[0].close()
+        except Exception:
+            pass
+
+    async def _recycle(self, slot):
+        slot[1] += 1
+        self.navigations += 1
+        self._context_navigations += 1
+        if slot[1] % self.check_every == 0:
+            slot[2] = await self._heap(slot[0])
+            self._heaps[id(slot[0])] = slot[2]
+        if slot[1] >= self.max_navigations or slot[2] > self.page_memory:
+            reason = "navigations" if slot[1] >= self.max_navigations else f"heap {slot[2] / 1e6:.0f} MB"
+            print(f"[Pages] recycling page after {slot[1]} navigations ({reason})")
+            self.page_restarts += 1
+            await self._discard(slot)
+            return
+        try:
+            # drop the old document so its scripts stop running while idle
+            await slot[0].goto("about:blank")
+        except Exception:
+            await self._discard(slot)
+            return
+        self._idle.append(slot)
+
+    async def _maybe_restart_context(self):
+        heap = sum(self._heaps.values())
+        if self._context_navigations < self.context_max_navigations and heap <= self.context_memory:
+            return
+        async with self._cond:
+            if self._restarting:
+                return
+            self._restarting = True
+            await self._cond.wait_for(lambda: self._leased == 0)
+        try:
+            await self.restart_context(f"{self._context_navigations} navigations, heap {heap / 1e6:.0f} MB")
+        finally:
+            async with self._cond:
+                self._restarting = False
+                self._cond.notify_all()
+
+    async def restart_context(self, reason=""):
+        print(f"[Pages] restarting browser context ({reason})")
+        state = None
+        try:
+            state = await self.context.storage_state()
+        except Exception as e:
+            print(f"[Pages] could not save storage state: {e!r}")
+        for slot in self._idle:
+            await self._discard(slot)
+        self._idle = []
+        self._heaps = {}
+        try:
+            await self.context.close()
+        except Exception:
+            pass
+        self.context = await self.context_factory(state)
+        if state and state.get("cookies"):
+            try:
+                await self.context.add_cookies(state["cookies"])
+            except Exception:
+                pass
+        self._context_navigations = 0
+        self.context_restarts += 1
+
+    async def close(self):
+        for slot in self._idle:
+            await self._discard(slot)
+        self._idle = []
+
+    def summary(self):
+        return (f"[Pages] {self.navigations} navigations on {self.size} pooled pages, "
+                f"{self.page_restarts} page recycles, {self.context_restarts} context restarts")
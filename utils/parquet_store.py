@@ -0,0 +1,221 @@
+# utils/parquet_store.py
+import json
+import os
+import shutil
+import sys
+import uuid
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from utils.ingest import parse_counts, parse_dates
+
+PARTITION_COLS = ["Hashtag_Seed", "upload_month"]
+
+SCHEMA = pa.schema([
+    ("Video_ID", pa.string()),
+    ("TikTok_Video_ID", pa.string()),
+    ("Author", pa.string()),
+    ("Caption", pa.string()),
+    ("Hashtags", pa.string()),
+    ("Like_Count", pa.int64()),
+    ("Comment_Count", pa.int64()),
+    ("Share_Count", pa.int64()),
+    ("Upload_Date", pa.timestamp("s")),
+    ("URL", pa.string()),
+    ("Author_Followers", pa.int64()),
+    ("Hashtag_Seed", pa.string()),
+    ("upload_month", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([(c, pa.string()) for c in PARTITION_COLS]), flavor="hive"
+)
+
+
+def to_frame(rows):
+    """Rows (dicts or a DataFrame) -> DataFrame with the dataset's column types."""
+    df = pd.DataFrame(rows).copy()
+    for name in SCHEMA.names:
+        if name not in df.columns:
+            df[name] = None
+    for c in ("Like_Count", "Comment_Count", "Share_Count", "Author_Followers"):
+        df[c] = parse_counts(df[c]).astype("Int64")
+    df["Upload_Date"] = parse_dates(df["Upload_Date"])
+    df["upload_month"] = df["Upload_Date"].dt.strftime("%Y-%m").fillna("unknown")
+    df["Hashtag_Seed"] = df["Hashtag_Seed"].fillna("unknown").astype(str)
+    for c in ("Video_ID", "TikTok_Video_ID", "Author", "Caption", "Hashtags", "URL"):
+        df[c] = df[c].astype("string")
+    return df[SCHEMA.names]
+
+
+def append_rows(root, rows):
+    """Write rows as new files under root/Hashtag_Seed=.../upload_month=.../."""
+    df = to_frame(rows)
+    if df.empty:
+        return 0
+    table = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+    pq.write_to_dataset(
+        table, str(root),
+        partitioning=PARTITIONING,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return len(df)
+
+
+COMPACT_MANIFEST = "_compact.json"  # "_" / "." names are skipped by pyarrow's dataset discovery
+
+
+def _finish_compaction(leaf):
+    """
+    Complete (or clean up after) a compaction of `leaf` that was interrupted.
+    The manifest is written once the merged file is complete, so with it the
+    swap is finished; without it any hidden merged file is a leftover.
+    """
+    manifest = leaf / COMPACT_MANIFEST
+    if manifest.exists():
+        swap = json.loads(manifest.read_text())
+        for name in swap["sources"]:
+            (leaf / name).unlink(missing_ok=True)
+        if (leaf / swap["merged"]).exists():
+            os.replace(leaf / swap["merged"], leaf / swap["target"])
+        manifest.unlink()
+    for tmp in leaf.glob(".compact-*.parquet.tmp"):
+        tmp.unlink()
+
+
+def recover(root):
+    """Finish any compaction a crash interrupted (see compact)."""
+    for manifest in Path(root).rglob(COMPACT_MANIFEST):
+        _finish_compaction(manifest.parent)
+
+
+def compact(root):
+    """
+    Merge the small per-flush files of every partition into one file each.
+    The merged file stays hidden (dot name) until a manifest of the swap is
+    on disk; then the sources are removed and the merged file renamed into
+    place, so a crash at any point never leaves a row visible twice and the
+    next compact / load finishes the swap.
+    """
+    root = Path(root)
+    recover(root)
+    for leaf in {p.parent for p in root.rglob("*.parquet")}:
+        files = sorted(leaf.glob("*.parquet"))
+        if len(files) < 2:
+            continue
+        table = pa.concat_tables([pq.read_table(f, partitioning=None) for f in files])
+        tmp = leaf / f".compact-{uuid.uuid4().hex}.parquet.tmp"
+        pq.write_table(table, tmp)
+        swap = {"merged": tmp.name, "target": f"part-{uuid.uuid4().hex}-0.parquet",
+                "sources": [f.name for f in files]}
+        manifest_tmp = leaf / f".{COMPACT_MANIFEST}.tmp"
+        manifest_tmp.write_text(json.dumps(swap))
+        os.replace(manifest_tmp, leaf / COMPACT_MANIFEST)
+        _finish_compaction(leaf)
+
+
+def make_filters(seeds=None, min_month=None, max_month=None):
+    """Partition filters for `load` from the analysis scripts' config values."""
+    filters = []
+    if seeds:
+        filters.append(("Hashtag_Seed", "in", list(seeds)))
+    if min_month:
+        filters.append(("upload_month", ">=", min_month))
+    if max_month:
+        filters.append(("upload_month", "<=", max_month))
+    return filters or None
+
+
+def load(root, columns=None, filters=None, csv_path=None):
+    """
+    Load the dataset as a DataFrame, reading only `columns` and only the
+    row groups / partitions matching `filters` (pyarrow DNF, e.g.
+    [("Hashtag_Seed", "in", ["kbeauty"]), ("upload_month", ">=", "2025-06")]).
+    Falls back to `csv_path` while the dataset has not been built yet.
+    """
+    root = Path(root)
+    if root.exists():
+        recover(root)
+        dataset = ds.dataset(str(root), schema=SCHEMA, format="parquet", partitioning=PARTITIONING)
+        expr = pq.filters_to_expression(filters) if filters else None
+        return dataset.to_table(columns=columns, filter=expr).to_pandas()
+    if csv_path is None:
+        raise FileNotFoundError(root)
+    print(f"[Parquet] {root} not built yet, reading {csv_path}")
+    return _load_csv(csv_path, columns, filters)
+
+
+_CSV_OPS = {
+    "in": lambda s, v: s.isin(v),
+    "not in": lambda s, v: ~s.isin(v),
+    "=": lambda s, v: s == v,
+    "==": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+    ">=": lambda s, v: s >= v,
+    "<=": lambda s, v: s <= v,
+    ">": lambda s, v: s > v,
+    "<": lambda s, v: s < v,
+}
+
+
+def _load_csv(csv_path, columns, filters):
+    """`load` on the raw CSV: the partition columns are derived like to_frame does, then filtered."""
+    filters = filters or []
+    for f in filters:
+        if not (isinstance(f, tuple) and len(f) == 3) or f[1] not in _CSV_OPS:
+            raise ValueError(f"CSV fallback can't evaluate filter {f!r}")
+    filter_cols = {col for col, _, _ in filters}
+    needed = None if columns is None else set(columns) | filter_cols
+    if needed is not None and "upload_month" in needed:
+        needed.add("Upload_Date")
+    df = pd.read_csv(csv_path, usecols=lambda c: needed is None or c in needed)
+
+    if needed is None or "upload_month" in needed:
+        if "Upload_Date" not in df.columns:
+            raise ValueError(f"{csv_path} has no Upload_Date to derive upload_month from")
+        df["upload_month"] = parse_dates(df["Upload_Date"]).dt.strftime("%Y-%m").fillna("unknown")
+    if "Hashtag_Seed" in df.columns:
+        df["Hashtag_Seed"] = df["Hashtag_Seed"].fillna("unknown").astype(str)
+
+    for col, op, val in filters:
+        if col not in df.columns:
+            raise ValueError(f"{csv_path} has no column {col!r} to filter on")
+        df = df[_CSV_OPS[op](df[col], val)]
+    if columns is not None:
+        df = df[[c for c in columns if c in df.columns]]
+    return df.reset_index(drop=True)
+
+
+def convert_csv(csv_path, root, chunksize=100_000):
+    """
+    (Re)build the dataset at `root` from a CSV. It is written to a hidden
+    sibling directory and swapped in once complete, so rebuilding from a
+    newer CSV replaces the old rows instead of adding to them.
+    """
+    root = Path(root)
+    build = root.with_name(f".{root.name}.build")
+    old = root.with_name(f".{root.name}.old")
+    for d in (build, old):
+        shutil.rmtree(d, ignore_errors=True)
+    n = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        chunk = chunk.loc[:, ~chunk.columns.str.contains("^Unnamed")]
+        n += append_rows(build, chunk)
+    build.mkdir(parents=True, exist_ok=True)
+    compact(build)
+    if root.exists():
+        os.replace(root, old)
+    os.replace(build, root)
+    shutil.rmtree(old, ignore_errors=True)
+    print(f"[Parquet] {n} rows from {csv_path} -> {root}")
+    return n
+
+
+if __name__ == "__main__":
+    # python utils/parquet_store.py <csv> <dataset_dir>
+    convert_csv(sys.argv[1], sys.argv[2])
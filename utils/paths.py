@@ -0,0 +1,25 @@
+# utils/paths.py
+import os
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def data_dir():
+    """data/ in the repo, unless $KBEAUTY_DATA_DIR (or `kbeauty --data-dir`) points elsewhere."""
+    return Path(os.environ.get("KBEAUTY_DATA_DIR") or PROJECT_ROOT / "data")
+
+
+def results_dir():
+    """results/ in the repo, unless $KBEAUTY_RESULTS_DIR (or `kbeauty --results-dir`) points elsewhere."""
+    return Path(os.environ.get("KBEAUTY_RESULTS_DIR") or PROJECT_ROOT / "results")
+
+
+def raw_dataset_dir():
+    """Partitioned Parquet copy of the scrapers' raw batches (utils/parquet_store.py), uncleaned."""
+    return data_dir() / "raw" / "tiktok_dataset"
+
+
+def dataset_dir():
+    """The Parquet dataset the analysis reads, built only from the cleaned / enriched CSV (convert_csv)."""
+    return data_dir() / "final" / "tiktok_dataset"
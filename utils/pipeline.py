@@ -0,0 +1,76 @@
+# utils/pipeline.py
+import asyncio
+
+_STOP = object()
+
+
+async def run_pipeline(produce, work, write, concurrency=3, window=20):
+    """
+    Producer -> workers -> writer, with backpressure at every stage.
+
+    `produce(emit)` awaits `emit(item)` for each item as soon as it finds
+    one; emit blocks while `window` items sit anywhere between the producer
+    and the writer. `concurrency` workers run `await work(item)`, and
+    `await write(result)` is called in emit order (a worker that raised or
+    returned None just advances the order).
+
+    If the producer or the writer raises, every other stage is cancelled
+    and the exception is re-raised, rather than leaving the rest blocked
+    on full queues.
+    """
+    work_q = asyncio.Queue(maxsize=concurrency)
+    done_q = asyncio.Queue(maxsize=concurrency)
+    slots = asyncio.Semaphore(window)
+    seq = 0
+
+    async def emit(item):
+        nonlocal seq
+        await slots.acquire()
+        await work_q.put((seq, item))
+        seq += 1
+
+    async def producer():
+        await produce(emit)
+        for _ in range(concurrency):
+            await work_q.put(_STOP)
+
+    async def worker():
+        while True:
+            job = await work_q.get()
+            if job is _STOP:
+                await done_q.put(_STOP)
+                return
+            i, item = job
+            try:
+                result = await work(item)
+            except Exception as e:
+                print(f"  [pipeline] worker failed: {e!r}")
+                result = None
+            await done_q.put((i, result))
+
+    async def writer():
+        pending, next_i, stopped = {}, 0, 0
+        while stopped < concurrency:
+            job = await done_q.get()
+            if job is _STOP:
+                stopped += 1
+                continue
+            i, result = job
+            pending[i] = result
+            # reorder buffer: results leave in the order they were emitted
+            while next_i in pending:
+                result = pending.pop(next_i)
+                if result is not None:
+                    await write(result)
+                next_i += 1
+                slots.release()
+
+    stages = [producer(), writer(), *(worker() for _ in range(concurrency))]
+    tasks = [asyncio.ensure_future(s) for s in stages]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -0,0 +1,64 @@
+# utils/readiness.py
+import time
+from collections import Counter, namedtuple
+
+# Resolves (truthy) as soon as the video page either has its data or is
+# recognisably walled off, so normal pages don't sleep and blocked ones fail fast.
+READY_JS = """
+() => {
+  if (document.querySelector('#captcha-verify-container, .captcha_verify_container, [class*="captcha-verify"], iframe[src*="captcha"]')) return 'blocked';
+  if (document.querySelector('[data-e2e="login-modal"], div[id^="loginContainer"], [data-e2e="modal-login"]')) return 'login';
+  const sigi = document.querySelector('script#SIGI_STATE');
+  if (sigi) {
+    try {
+      const state = JSON.parse(sigi.textContent);
+      if (Object.keys(state.ItemModule || {}).length) return 'ready';
+    } catch (e) {}
+  }
+  const rehy = document.querySelector('script#__UNIVERSAL_DATA_FOR_REHYDRATION__');
+  if (rehy) {
+    try {
+      const scope = JSON.parse(rehy.textContent).__DEFAULT_SCOPE__ || {};
+      const detail = scope['webapp.video-detail'];
+      if (detail && detail.itemInfo && detail.itemInfo.itemStruct) return 'ready';
+      if (detail && detail.statusCode && detail.statusCode !== 0) return 'unavailable';
+    } catch (e) {}
+  }
+  if (document.querySelector('[data-e2e="browse-video-desc"], [data-e2e="video-desc"]')) return 'ready';
+  return false;
+}
+"""
+
+Readiness = namedtuple("Readiness", ["status", "elapsed_ms"])
+
+
+async def wait_for_video_data(page, timeout=10000, poll_ms=100):
+    """
+    Wait until the video page is ready, blocked, login-walled or unavailable.
+    Returns Readiness(status, elapsed_ms); status is "timeout" if nothing showed up.
+    """
+    start = time.monotonic()
+    try:
+        handle = await page.wait_for_function(READY_JS, timeout=timeout, polling=poll_ms)
+        status = await handle.json_value()
+    except Exception:
+        status = "timeout"
+    return Readiness(status, int((time.monotonic() - start) * 1000))
+
+
+class ReadinessStats:
+    """Time-to-data per page and a count of each readiness outcome."""
+
+    def __init__(self):
+        self.records = []
+        self.statuses = Counter()
+
+    def record(self, url, ready):
+        self.records.append({"URL": url, "status": ready.status, "elapsed_ms": ready.elapsed_ms})
+        self.statuses[ready.status] += 1
+
+    def summary(self):
+        ready_ms = sorted(r["elapsed_ms"] for r in self.records if r["status"] == "ready")
+        median = ready_ms[len(ready_ms) // 2] if ready_ms else None
+        counts = ", ".join(f"{s}={n}" for s, n in self.statuses.most_common()) or "no pages"
+        return f"[Ready] {counts}; median time-to-data = {median} ms"
@@ -0,0 +1,216 @@
+# utils/replay.py
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+
+# resource types worth recording: the HTML shell (with SIGI_STATE / the
+# rehydration blob), the scripts that render it, and the item-list XHRs
+RECORD_TYPES = ("document", "script", "xhr", "fetch", "stylesheet")
+
+# query params that identify a response; the rest (msToken, X-Bogus,
+# device ids, ...) change on every request and are ignored when matching
+STABLE_PARAMS = ("cursor", "count", "challengeID", "itemId", "id", "secUid")
+
+BLOCKED_HTML = (
+    "<html><head><meta name=\"description\" content=\"Sign up for an account\"></head>"
+    "<body><div id=\"loginContainer\">Log in to TikTok</div></body></html>"
+)
+
+
+def replay_key(url):
+    """Host + path + stable query params, so re-signed requests still match."""
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query) if k in STABLE_PARAMS)
+    query = "&".join(f"{k}={v}" for k, v in params)
+    return f"{parts.netloc}{parts.path}" + (f"?{query}" if query else "")
+
+
+class Recorder:
+    """
+    Saves the responses a live scrape receives (bodies under `root/bodies`,
+    one JSON line per response in `root/manifest.jsonl`) so they can be
+    replayed offline by ReplayServer.
+    """
+
+    def __init__(self, root, resource_types=RECORD_TYPES):
+        self.root = Path(root)
+        self.bodies = self.root / "bodies"
+        self.bodies.mkdir(parents=True, exist_ok=True)
+        self.resource_types = set(resource_types)
+        self._manifest = open(self.root / "manifest.jsonl", "a", encoding="utf-8")
+        self._pending = set()
+        self.saved = 0
+
+    def attach(self, context):
+        context.on("response", self._on_response)
+
+    def _on_response(self, response):
+        req = response.request
+        if req.method != "GET" or req.resource_type not in self.resource_types:
+            return
+        task = asyncio.ensure_future(self._save(response))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _save(self, response):
+        try:
+            body = await response.body()
+        except Exception:
+            return  # redirects and aborted requests have no body
+        digest = hashlib.sha1(body).hexdigest()
+        path = self.bodies / f"{digest}.bin"
+        if not path.exists():
+            path.write_bytes(body)
+        entry = {
+            "key": replay_key(response.url),
+            "url": response.url,
+            "status": response.status,
+            "content_type": response.headers.get("content-type", ""),
+            "resource_type": response.request.resource_type,
+            "file": path.name,
+        }
+        self._manifest.write(json.dumps(entry) + "\n")
+        self._manifest.flush()
+        self.saved += 1
+
+    async def close(self):
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        self._manifest.close()
+        print(f"[Replay] recorded {self.saved} responses -> {self.root}")
+
+
+def load_manifest(root):
+    """key -> latest manifest entry."""
+    entries = {}
+    path = Path(root) / "manifest.jsonl"
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                e = json.loads(line)
+                entries[e["key"]] = e
+    return entries
+
+
+def recorded_pages(root):
+    """(tag page urls, video page urls) among the recorded documents."""
+    tags, videos = [], []
+    for e in load_manifest(root).values():
+        if e["resource_type"] != "document":
+            continue
+        path = urlsplit(e["url"]).path
+        if path.startswith("/tag/"):
+            tags.append(e["url"])
+        elif "/video/" in path:
+            videos.append(e["url"])
+    return tags, videos
+
+
+class ReplayServer:
+    """
+    Local HTTP stand-in for TikTok that serves recorded responses at
+    /r/<quoted replay key>, each after `latency_ms` (a (min, max) range).
+    Failure injection: `fail_rate` answers 503, `block_rate` answers HTML
+    documents with a login wall. Unknown keys are 404s.
+    """
+
+    def __init__(self, root, latency_ms=(0, 0), fail_rate=0.0, block_rate=0.0, port=0, seed=None):
+        self.root = Path(root)
+        self.entries = load_manifest(root)
+        self.latency_ms = latency_ms
+        self.fail_rate = fail_rate
+        self.block_rate = block_rate
+        self.rng = random.Random(seed)
+        self.stats = {"served": 0, "missing": 0, "failed": 0, "blocked": 0, "route_errors": 0}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, url):
+        return f"{self.base_url}/r/{quote(replay_key(url), safe='')}"
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", content_type="text/plain"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                lo, hi = server.latency_ms
+                with server._lock:
+                    delay = server.rng.uniform(lo, hi) / 1000
+                    roll = server.rng.random()
+                time.sleep(delay)
+                entry = server.entries.get(unquote(self.path[len("/r/"):])) if self.path.startswith("/r/") else None
+                if entry is None:
+                    server._count("missing")
+                    return self._send(404)
+                if roll < server.fail_rate:
+                    server._count("failed")
+                    return self._send(503)
+                if entry["resource_type"] == "document" and roll < server.fail_rate + server.block_rate:
+                    server._count("blocked")
+                    return self._send(200, BLOCKED_HTML.encode(), "text/html; charset=utf-8")
+                server._count("served")
+                body = (server.root / "bodies" / entry["file"]).read_bytes()
+                self._send(entry["status"], body, entry["content_type"] or "application/octet-stream")
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    async def install(self, context):
+        """Route every GET of the context to this server; anything else is aborted."""
+        async def _handle(route):
+            req = route.request
+            try:
+                if req.method != "GET" or not req.url.startswith("http"):
+                    return await route.abort()
+                response = await route.fetch(url=self.url_for(req.url))
+                await route.fulfill(response=response)
+            except Exception:
+                # resolve the route anyway: a hanging request would sit until
+                # Playwright's timeout and skew the benchmark
+                self._count("route_errors")
+                try:
+                    await route.abort()
+                except Exception:
+                    pass
+        await context.route("**/*", _handle)
+
+    def summary(self):
+        s = self.stats
+        return (f"[Replay] served {s['served']}, missing {s['missing']}, "
+                f"injected failures {s['failed']}, injected blocks {s['blocked']}, "
+                f"aborted routes {s['route_errors']}")
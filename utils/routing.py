@@ -0,0 +1,73 @@
+# utils/routing.py
+import re
+from collections import Counter
+
+# resource types we never need: we only read text, JSON and the HTML shell
+DEFAULT_BLOCK_TYPES = ("media", "image", "font")
+
+# URLs that stay allowed whatever their type (captcha / verify widgets need their images)
+DEFAULT_ALLOW_PATTERNS = (r"captcha", r"/verify", r"sf-tb-sg\.ibytedtos\.com/obj/rc-verify")
+
+# URLs blocked whatever their type (telemetry beacons)
+DEFAULT_DENY_PATTERNS = (r"/monitor_browser/", r"mon-va\.tiktokv\.com", r"mcs-va\.tiktokv\.com")
+
+# typical transfer sizes, only used to estimate bytes saved by blocked requests
+EST_BYTES = {
+    "media": 1_500_000,
+    "image": 60_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "script": 80_000,
+}
+EST_BYTES_DEFAULT = 5_000
+
+
+class RoutePolicy:
+    """
+    Context-wide page.route filter. A request is aborted when its URL
+    matches a deny pattern, or its resource type is in `block_types` and
+    its URL matches no allow pattern. Everything else continues.
+    """
+
+    def __init__(self, block_types=DEFAULT_BLOCK_TYPES,
+                 allow_patterns=DEFAULT_ALLOW_PATTERNS,
+                 deny_patterns=DEFAULT_DENY_PATTERNS):
+        self.block_types = set(block_types)
+        self.allow = [re.compile(p) for p in allow_patterns]
+        self.deny = [re.compile(p) for p in deny_patterns]
+        self.blocked = Counter()
+        self.allowed = 0
+        self.bytes_saved = 0
+
+    def should_block(self, url, resource_type):
+        if any(p.search(url) for p in self.deny):
+            return True
+        if resource_type in self.block_types:
+            return not any(p.search(url) for p in self.allow)
+        return False
+
+    async def _handle(self, route):
+        req = route.request
+        if self.should_block(req.url, req.resource_type):
+            self.blocked[req.resource_type] += 1
+            self.bytes_saved += EST_BYTES.get(req.resource_type, EST_BYTES_DEFAULT)
+            try:
+                await route.abort()
+            except Exception:
+                pass
+            return
+        self.allowed += 1
+        try:
+            await route.continue_()
+        except Exception:
+            pass
+
+    async def install(self, context):
+        # applies to every page the context opens, including ones opened later
+        await context.route("**/*", self._handle)
+
+    def summary(self):
+        total = sum(self.blocked.values())
+        by_type = ", ".join(f"{t}={n}" for t, n in self.blocked.most_common()) or "none"
+        return (f"[Route] blocked {total} requests ({by_type}), allowed {self.allowed}, "
+                f"~{self.bytes_saved / 1_000_000:.1f} MB saved (estimated)")
@@ -0,0 +1,116 @@
+# utils/seen_index.py
+import csv
+import sqlite3
+import sys
+from pathlib import Path
+
+from utils.idgen import id_seq
+
+
+class SeenIndex:
+    """
+    On-disk index next to a raw CSV: every TikTok_Video_ID, the highest
+    Video_ID sequence number and the row count. It is rebuilt from the CSV
+    once (or when the CSV changed behind its back) and afterwards only
+    updated on append, so startup cost does not grow with the dataset.
+
+    Also behaves like the `seen_ids` set the scrapers pass around: `add`
+    and `discard` only touch this run's in-memory claims until `record`
+    persists the rows that were actually written.
+    """
+
+    def __init__(self, csv_path, index_path=None):
+        self.csv_path = Path(csv_path)
+        self.index_path = Path(index_path or self.csv_path.with_suffix(".seen.sqlite"))
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.index_path))
+        self.conn.execute("CREATE TABLE IF NOT EXISTS videos (tiktok_id TEXT PRIMARY KEY)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self.claims = set()
+        if self._csv_signature() != self._stored_signature():
+            self.rebuild()
+
+    # --- persistence ---
+    def _meta(self, key, default=0):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, **values):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", values.items()
+        )
+
+    def _csv_signature(self):
+        return self.csv_path.stat().st_size if self.csv_path.exists() else 0
+
+    def _stored_signature(self):
+        return self._meta("csv_size", -1)
+
+    def rebuild(self):
+        print(f"[Index] Building seen-video index from {self.csv_path} ...")
+        csv.field_size_limit(sys.maxsize)
+        max_seq, rows = 0, 0
+        with self.conn:
+            self.conn.execute("DELETE FROM videos")
+            if self.csv_path.exists():
+                with open(self.csv_path, newline="", encoding="utf-8", errors="replace") as f:
+                    batch = []
+                    for rec in csv.DictReader(f):
+                        rows += 1
+                        max_seq = max(max_seq, id_seq(rec.get("Video_ID")))
+                        vid = rec.get("TikTok_Video_ID")
+                        if vid:
+                            batch.append((str(vid),))
+                        if len(batch) >= 10_000:
+                            self.conn.executemany("INSERT OR IGNORE INTO videos VALUES (?)", batch)
+                            batch = []
+                    self.conn.executemany("INSERT OR IGNORE INTO videos VALUES (?)", batch)
+            self._set_meta(max_seq=max_seq, row_count=rows, csv_size=self._csv_signature())
+        print(f"[Index] {rows} rows, {self.video_count} distinct videos")
+
+    def record(self, tiktok_ids, video_ids):
+        """Call right after appending these rows to the CSV."""
+        tiktok_ids = [str(v) for v in tiktok_ids]
+        max_seq = max([self.max_seq] + [id_seq(v) for v in video_ids])
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO videos VALUES (?)", [(v,) for v in tiktok_ids])
+            self._set_meta(
+                max_seq=max_seq,
+                row_count=self.row_count + len(tiktok_ids),
+                csv_size=self._csv_signature(),
+            )
+        self.claims.difference_update(tiktok_ids)
+
+    def close(self):
+        self.conn.close()
+
+    # --- stats ---
+    @property
+    def max_seq(self):
+        return self._meta("max_seq")
+
+    @property
+    def row_count(self):
+        return self._meta("row_count")
+
+    @property
+    def video_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+
+    def next_seq(self):
+        return self.max_seq + 1
+
+    # --- set-like view used as seen_ids ---
+    def __contains__(self, vid):
+        vid = str(vid)
+        if vid in self.claims:
+            return True
+        return self.conn.execute(
+            "SELECT 1 FROM videos WHERE tiktok_id = ?", (vid,)
+        ).fetchone() is not None
+
+    def add(self, vid):
+        self.claims.add(str(vid))
+
+    def discard(self, vid):
+        self.claims.discard(str(vid))
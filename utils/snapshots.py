@@ -0,0 +1,241 @@
+# utils/snapshots.py
+import asyncio
+import csv
+import heapq
+import io
+import json
+import math
+import sqlite3
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+
+def _int(value):
+    try:
+        return int(float(str(value).replace(",", "")))
+    except (TypeError, ValueError):
+        return None
+
+
+def engagement(likes, comments, shares):
+    """Likes + comments + shares, or None when none of them was read."""
+    counts = [v for v in (likes, comments, shares) if v is not None]
+    return sum(counts) if counts else None
+
+
+def _upload_ts(raw):
+    raw = (raw or "").strip()
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.strptime(raw[:19], fmt).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+class SnapshotStore:
+    """
+    Append-only engagement history: one row per (TikTok_Video_ID, timestamp)
+    with the like/comment/share counts seen at that moment. Rows are never
+    updated, so growth between any two visits can be read back later.
+    Readings without any count (a blocked page) are not stored. Upload
+    times are kept alongside, and how far each seed CSV has been read, so
+    a run only reads the rows appended since the last one.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            " tiktok_id TEXT NOT NULL, ts REAL NOT NULL, url TEXT,"
+            " like_count INTEGER, comment_count INTEGER, share_count INTEGER,"
+            " source TEXT, PRIMARY KEY (tiktok_id, ts))"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploads (tiktok_id TEXT PRIMARY KEY, upload_ts REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seeded (path TEXT PRIMARY KEY, offset INTEGER, header TEXT)"
+        )
+
+    def add(self, tiktok_id, url, likes, comments, shares, ts=None, source="refresh"):
+        """Store one reading; False if it had no counts (and was skipped)."""
+        return bool(self.add_many([(tiktok_id, url, likes, comments, shares, ts, source)]))
+
+    def add_many(self, snaps):
+        """Store (tiktok_id, url, likes, comments, shares, ts, source) readings; returns how many."""
+        now = time.time()
+        rows = [(str(vid), ts or now, url, _int(lk), _int(cm), _int(sh), source)
+                for vid, url, lk, cm, sh, ts, source in snaps]
+        rows = [r for r in rows if any(v is not None for v in r[3:6])]
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO snapshots VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def add_uploads(self, rows):
+        """Remember the upload time of scraper rows (dicts with TikTok_Video_ID / Upload_Date)."""
+        uploads = [(str(r["TikTok_Video_ID"]), _upload_ts(r.get("Upload_Date")))
+                   for r in rows if r.get("TikTok_Video_ID")]
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO uploads VALUES (?, ?)",
+                                  [u for u in uploads if u[1] is not None])
+
+    def add_rows(self, rows, source="discovery"):
+        """Snapshot scraper rows (dicts with the CSV columns) as of now."""
+        self.add_uploads(rows)
+        return self.add_many([
+            (r["TikTok_Video_ID"], r.get("URL"), r.get("Like_Count"), r.get("Comment_Count"),
+             r.get("Share_Count"), None, source)
+            for r in rows if r.get("TikTok_Video_ID")
+        ])
+
+    def _new_csv_rows(self, csv_path):
+        """DictReader over the rows appended to `csv_path` since the last call, and the new offset."""
+        size = csv_path.stat().st_size
+        done = self.conn.execute("SELECT offset, header FROM seeded WHERE path = ?",
+                                 (str(csv_path),)).fetchone()
+        offset, header = done if done and done[0] <= size else (0, None)
+        with open(csv_path, "rb") as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        # an unfinished last line is read next time
+        data = data[:data.rfind(b"\n") + 1]
+        text = data.decode("utf-8-sig" if offset == 0 else "utf-8", errors="replace")
+        reader = csv.DictReader(io.StringIO(text, newline=""),
+                                fieldnames=json.loads(header) if header else None)
+        return reader, offset + len(data)
+
+    def seed_from_csv(self, csv_path):
+        """
+        Give every video of a discovery CSV that has no snapshot yet its
+        discovery-time counts, and record its upload time. The CSV has no
+        scrape timestamp, so its mtime stands in for it. Only the rows
+        appended since the last call are read; a file that got shorter
+        (rewritten) is read again from the start.
+        """
+        csv_path = Path(csv_path)
+        if not csv_path.exists():
+            return 0
+        csv.field_size_limit(sys.maxsize)
+        ts = csv_path.stat().st_mtime
+        reader, offset = self._new_csv_rows(csv_path)
+        rows = [r for r in reader if r.get("TikTok_Video_ID")]
+        known = {r[0] for r in self.conn.execute("SELECT DISTINCT tiktok_id FROM snapshots")}
+        snaps = {}
+        for r in rows:
+            vid = str(r["TikTok_Video_ID"])
+            if vid not in known and vid not in snaps:
+                snaps[vid] = (vid, r.get("URL"), r.get("Like_Count"), r.get("Comment_Count"),
+                              r.get("Share_Count"), ts, "seed")
+        self.add_uploads(rows)
+        added = self.add_many(snaps.values())
+        if reader.fieldnames:
+            with self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO seeded VALUES (?, ?, ?)",
+                                  (str(csv_path), offset, json.dumps(reader.fieldnames)))
+        return added
+
+    def upload_times(self):
+        """TikTok_Video_ID -> upload time (epoch seconds)."""
+        return dict(self.conn.execute("SELECT tiktok_id, upload_ts FROM uploads"))
+
+    def latest(self):
+        """tiktok_id -> (url, [(ts, engagement), ...]) with the last two snapshots."""
+        out = {}
+        for vid, ts, url, lk, cm, sh in self.conn.execute(
+            "SELECT tiktok_id, ts, url, like_count, comment_count, share_count "
+            "FROM snapshots ORDER BY tiktok_id, ts DESC"
+        ):
+            eng = engagement(lk, cm, sh)
+            if eng is None:
+                continue  # stored before count-less readings were skipped
+            entry = out.setdefault(vid, [url, []])
+            if len(entry[1]) < 2:
+                entry[0] = entry[0] or url
+                entry[1].append((ts, eng))
+        return {vid: (url, snaps) for vid, (url, snaps) in out.items()}
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class RefreshQueue:
+    """
+    Max-priority queue of videos to re-visit. A video's priority grows with
+    its recent engagement velocity (growth per hour between its last two
+    snapshots, or lifetime average per hour since upload when it has only
+    one) and with the hours since its last snapshot, both log-scaled so
+    neither term swamps the other. Videos refreshed less than
+    `min_age_hours` ago are not queued.
+    """
+
+    def __init__(self, velocity_weight=1.0, staleness_weight=1.0, min_age_hours=6.0):
+        self.velocity_weight = velocity_weight
+        self.staleness_weight = staleness_weight
+        self.min_age_hours = min_age_hours
+        self._heap = []
+
+    def priority(self, snaps, upload_ts=None, now=None):
+        now = now or time.time()
+        last_ts, last_eng = snaps[0]
+        if len(snaps) > 1:
+            prev_ts, prev_eng = snaps[1]
+            velocity = max(0, last_eng - prev_eng) / max((last_ts - prev_ts) / 3600, 1 / 60)
+        elif upload_ts:
+            velocity = last_eng / max((last_ts - upload_ts) / 3600, 1.0)
+        else:
+            velocity = 0.0
+        age_h = (now - last_ts) / 3600
+        return (self.velocity_weight * math.log1p(velocity)
+                + self.staleness_weight * math.log1p(age_h))
+
+    def build(self, latest, upload_dates=None, now=None):
+        now = now or time.time()
+        upload_dates = upload_dates or {}
+        self._heap = []
+        for vid, (url, snaps) in latest.items():
+            if not url or (now - snaps[0][0]) / 3600 < self.min_age_hours:
+                continue
+            p = self.priority(snaps, upload_dates.get(vid), now)
+            heapq.heappush(self._heap, (-p, vid, url))
+        return len(self._heap)
+
+    def pop(self, n):
+        """The `n` most urgent (tiktok_id, url, priority) entries."""
+        out = []
+        while self._heap and len(out) < n:
+            p, vid, url = heapq.heappop(self._heap)
+            out.append((vid, url, -p))
+        return out
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class PageBudget:
+    """At most `per_hour` page loads in any sliding hour; `acquire()` waits for room."""
+
+    def __init__(self, per_hour):
+        self.per_hour = per_hour
+        self.starts = deque()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self.starts and now - self.starts[0] >= 3600:
+                    self.starts.popleft()
+                if len(self.starts) < self.per_hour:
+                    self.starts.append(now)
+                    return
+                await asyncio.sleep(3600 - (now - self.starts[0]))
+
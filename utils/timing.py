@@ -0,0 +1,148 @@
+# utils/timing.py
+import bisect
+import contextvars
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+# histogram bucket upper bounds, seconds (Prometheus-style, cumulative on export)
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_url = contextvars.ContextVar("timing_url", default=None)
+_tag = contextvars.ContextVar("timing_tag", default=None)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None past the last bucket)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS + (None,), self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+
+class StageTimer:
+    """
+    Wall-clock time per scraper stage (goto, state wait, extraction, pauses,
+    ...). Every timed stage becomes one JSON line in `path` with the URL and
+    hashtag it belongs to; stages also feed a per-stage histogram and
+    per-hashtag totals, kept in memory for `summary()` and
+    `write_prometheus()`. The URL / hashtag come from `bind()`, which is
+    scoped to the current asyncio task, so helpers deep in a worker (like
+    human_pause) are attributed to the right video.
+    """
+
+    def __init__(self, path=None):
+        self.path = None
+        self.stages = defaultdict(_Histogram)
+        self.by_tag = defaultdict(lambda: defaultdict(float))
+        self.failures = defaultdict(int)
+        self._f = None
+        if path:
+            self.open(path)
+
+    def open(self, path):
+        """Start writing stage lines to `path` (appended, line-buffered)."""
+        self.close()
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    def bind(self, url=None, tag=None):
+        if url is not None:
+            _url.set(url)
+        if tag is not None:
+            _tag.set(tag)
+
+    @contextmanager
+    def stage(self, name, url=None, tag=None):
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record(name, time.perf_counter() - start, url=url, tag=tag, ok=ok)
+
+    def record(self, name, seconds, url=None, tag=None, ok=True):
+        url = url or _url.get()
+        tag = tag or _tag.get()
+        self.stages[name].observe(seconds)
+        self.by_tag[tag or "-"][name] += seconds
+        if not ok:
+            self.failures[name] += 1
+        if self._f:
+            self._f.write(json.dumps({
+                "ts": round(time.time(), 3), "stage": name, "ms": round(seconds * 1000, 1),
+                "url": url, "tag": tag, "ok": ok,
+            }) + "\n")
+
+    def summary(self):
+        total = sum(h.sum for h in self.stages.values()) or 1.0
+        lines = ["[Timing] stage              count   total s  share   ~p50 s  ~p95 s  failed"]
+        for name, h in sorted(self.stages.items(), key=lambda kv: -kv[1].sum):
+            p50, p95 = h.quantile(0.5), h.quantile(0.95)
+            lines.append(
+                f"[Timing] {name:<18} {h.count:>6} {h.sum:>9.1f} {h.sum / total:>6.0%} "
+                f"{'>' + str(BUCKETS[-1]) if p50 is None else p50:>8} "
+                f"{'>' + str(BUCKETS[-1]) if p95 is None else p95:>7} {self.failures[name]:>7}"
+            )
+        for tag, stages in sorted(self.by_tag.items()):
+            lines.append(f"[Timing] #{tag}: {sum(stages.values()):.1f} s")
+        return "\n".join(lines)
+
+    def write_prometheus(self, path, prefix="kbeauty_scrape"):
+        """Textfile-collector export, written to a temp file and renamed into place."""
+        out = [
+            f"# HELP {prefix}_stage_seconds Wall-clock seconds per scraper stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for name, h in sorted(self.stages.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS, h.counts):
+                cumulative += n
+                out.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            out.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {h.count}')
+            out.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {h.sum:.3f}')
+            out.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {h.count}')
+        out += [
+            f"# HELP {prefix}_stage_failures_total Stages that raised.",
+            f"# TYPE {prefix}_stage_failures_total counter",
+        ]
+        for name, n in sorted(self.failures.items()):
+            out.append(f'{prefix}_stage_failures_total{{stage="{name}"}} {n}')
+        out += [
+            f"# HELP {prefix}_hashtag_seconds Wall-clock seconds per hashtag and stage.",
+            f"# TYPE {prefix}_hashtag_seconds gauge",
+        ]
+        for tag, stages in sorted(self.by_tag.items()):
+            for name, secs in sorted(stages.items()):
+                out.append(f'{prefix}_hashtag_seconds{{hashtag="{tag}",stage="{name}"}} {secs:.3f}')
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text("\n".join(out) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+
+    def close(self):
+        if self._f:
+            self._f.close()
+            self._f = None
@@ -0,0 +1,73 @@
+# utils/workers.py
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+
+class HostLimiter:
+    """
+    Politeness cap: at most `per_host` requests in flight per host, and
+    at least `min_interval` seconds between two request starts on it.
+    """
+
+    def __init__(self, per_host=2, min_interval=0.0):
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self._sems = {}
+        self._locks = {}
+        self._last_start = {}
+
+    @asynccontextmanager
+    async def slot(self, url):
+        host = urlparse(url).netloc
+        sem = self._sems.setdefault(host, asyncio.Semaphore(self.per_host))
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with sem:
+            async with lock:
+                wait = self._last_start.get(host, 0.0) + self.min_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._last_start[host] = time.monotonic()
+            yield
+
+
+def claim_video_id(seen_ids, vid):
+    # check-and-add with no await in between, so concurrent workers on the
+    # same event loop can never both claim the same video
+    if vid in seen_ids:
+        return False
+    seen_ids.add(vid)
+    return True
+
+
+async def run_pool(items, worker, concurrency=4, per_host=2, host_interval=0.0, url_of=None):
+    """
+    Run `await worker(i, item)` for every item with at most `concurrency`
+    workers in flight and a per-host politeness cap. Results are returned
+    in input order; an item whose worker raised comes back as None.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    queue = asyncio.Queue()
+    for i, item in enumerate(items):
+        queue.put_nowait((i, item))
+    limiter = HostLimiter(per_host=per_host, min_interval=host_interval)
+    url_of = url_of or (lambda item: item)
+
+    async def _run():
+        while True:
+            try:
+                i, item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                async with limiter.slot(url_of(item)):
+                    results[i] = await worker(i, item)
+            except Exception as e:
+                print(f"  [worker] failed on {url_of(item)}: {e!r}")
+                results[i] = None
+
+    n_workers = max(1, min(concurrency, len(items)))
+    await asyncio.gather(*(_run() for _ in range(n_workers)))
+    return results
@@ -0,0 +1,141 @@
+# utils/writer.py
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def read_header(path):
+    """Column names from the first record of an existing CSV (None if missing/empty)."""
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+    csv.field_size_limit(sys.maxsize)
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        return next(csv.reader(f), None)
+
+
+class RowWriter:
+    """
+    Buffered, append-only CSV writer shared by the scrapers.
+
+    Rows are buffered and flushed every `flush_every` rows or `flush_interval`
+    seconds (checked on write), and on close. If the file already exists its
+    header decides the column order, so no pandas re-read is needed; otherwise
+    `columns` is used and the file is created via temp file + rename. Each
+    flush is a single O_APPEND write that is fsynced, and truncated back if
+    it fails halfway, so a crash never leaves half a batch behind.
+    `on_flush(rows)` runs after every successful flush.
+
+    Rows with an empty `key` column are skipped and a key already written in
+    this run (e.g. a journal replay plus a worker re-emitting the same video)
+    is written once, like the old drop_duplicates before each append. The
+    check happens in `write`, which returns whether the row was taken, so
+    callers only number (or count) rows that will be written.
+    """
+
+    def __init__(self, path, columns, flush_every=25, flush_interval=30.0, on_flush=None,
+                 key="TikTok_Video_ID"):
+        self.path = Path(path)
+        self.columns = read_header(self.path) or list(columns)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.key = key if key in self.columns else None
+        self.skipped = 0
+        self._keys = set()
+        self.buffer = []
+        self.written = 0
+        self._last_flush = time.monotonic()
+
+    def _encode(self, rows, header=False):
+        buf = io.StringIO()
+        w = csv.writer(buf, quoting=csv.QUOTE_ALL, lineterminator="\n")
+        if header:
+            w.writerow(self.columns)
+        for r in rows:
+            w.writerow(["" if r.get(c) is None else r.get(c) for c in self.columns])
+        return buf.getvalue().encode("utf-8")
+
+    def write(self, row):
+        if not self._accept(row):
+            return False
+        self.buffer.append(row)
+        if (len(self.buffer) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+        return True
+
+    def write_many(self, rows):
+        """Write each row; returns the ones that were taken."""
+        return [r for r in rows if self.write(r)]
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        rows, self.buffer = self.buffer, []
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists():
+            self._create(rows)
+        else:
+            self._append(rows)
+        self.written += len(rows)
+        if self.on_flush:
+            self.on_flush(rows)
+
+    def _accept(self, row):
+        if self.key is None:
+            return True
+        k = row.get(self.key)
+        k = "" if k is None else str(k).strip()
+        if not k or k in self._keys:
+            self.skipped += 1
+            return False
+        self._keys.add(k)
+        return True
+
+    def _create(self, rows):
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._encode(rows, header=True))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def _append(self, rows):
+        data = self._encode(rows)
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND)
+        try:
+            size = os.fstat(fd).st_size
+            if size:
+                # never glue the first row onto a last line without a newline
+                os.lseek(fd, size - 1, os.SEEK_SET)
+                if os.read(fd, 1) != b"\n":
+                    data = b"\n" + data
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+            except BaseException:
+                os.ftruncate(fd, size)
+                raise
+        finally:
+            os.close(fd)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()